@@ -0,0 +1,181 @@
+"""
+Módulo para escolher automaticamente o número de threads de cálculo do PyTorch na CPU.
+
+Por padrão o PyTorch usa uma thread por núcleo, o que sobrecarrega a máquina quando há
+workers do DataLoader ou vários treinos ao mesmo tempo. Aqui alguns passos do modelo
+real são medidos com diferentes números de threads, o mais rápido é aplicado com
+torch.set_num_threads e a escolha fica gravada em um cache por máquina e por modelo.
+"""
+import copy
+import json
+import os
+import socket
+import time
+import torch
+
+ARQUIVO_CACHE = '.cache_threads.json'
+
+
+def candidatos_threads(maximo):
+    """
+    Gera os números de threads a testar: potências de 2 até o máximo, mais o máximo.
+
+    Args:
+        maximo: Maior número de threads permitido
+
+    Returns:
+        list: Números de threads em ordem crescente
+    """
+    candidatos = {maximo}
+    threads = 1
+    while threads < maximo:
+        candidatos.add(threads)
+        threads *= 2
+    return sorted(candidatos)
+
+
+def _limitar_interop():
+    """
+    Reduz para 1 o pool de threads inter-op, que os modelos do projeto não usam.
+
+    Só é possível antes de qualquer trabalho paralelo inter-op; depois disso o PyTorch
+    recusa a mudança e o pool padrão é mantido.
+    """
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+
+def _chave_cache(modelo, formato_entrada, treino, channels_last, maximo):
+    """Identifica a máquina, a arquitetura do modelo e a carga medida."""
+    parametros = sum(p.numel() for p in modelo.parameters())
+    return '|'.join([
+        socket.gethostname(),
+        f"{type(modelo).__name__}:{parametros}",
+        'treino' if treino else 'inferencia',
+        'x'.join(str(d) for d in formato_entrada),
+        'channels_last' if channels_last else 'contiguous',
+        f"max{maximo}",
+        f"torch{torch.__version__}"
+    ])
+
+
+def _ler_cache(caminho_cache):
+    """Lê o cache de escolhas (dicionário vazio se não existir ou estiver corrompido)."""
+    if not caminho_cache or not os.path.exists(caminho_cache):
+        return {}
+    try:
+        with open(caminho_cache, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️  Aviso: Não foi possível ler o cache de threads, será recriado: {e}")
+        return {}
+
+
+def _gravar_cache(cache, caminho_cache):
+    """Grava o cache de forma atômica."""
+    try:
+        caminho_temp = caminho_cache + '.tmp'
+        with open(caminho_temp, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(caminho_temp, caminho_cache)
+    except OSError as e:
+        print(f"⚠️  Aviso: Não foi possível gravar o cache de threads: {e}")
+
+
+def medir_threads(modelo, entrada, threads, treino=True, passos=3, aquecimento=1):
+    """
+    Mede o tempo médio de um passo do modelo com um número de threads.
+
+    Args:
+        modelo: Modelo (cópia descartável; no treino os gradientes são acumulados nele)
+        entrada: Lote de entrada já no formato de memória do modelo
+        threads: Número de threads de cálculo
+        treino: Se True mede forward + backward; se False, apenas o forward sem gradientes
+        passos: Passos medidos
+        aquecimento: Passos executados antes da medição (alocações, escolha de kernels)
+
+    Returns:
+        float: Segundos por passo
+    """
+    torch.set_num_threads(threads)
+    for passo in range(aquecimento + passos):
+        if passo == aquecimento:
+            inicio = time.perf_counter()
+        if treino:
+            modelo(entrada).float().sum().backward()
+            modelo.zero_grad(set_to_none=True)
+        else:
+            with torch.no_grad():
+                modelo(entrada)
+    return (time.perf_counter() - inicio) / passos
+
+
+def ajustar_threads(modelo, formato_entrada, treino=True, channels_last=False, workers=0,
+                    processos=1, passos=3, caminho_cache=ARQUIVO_CACHE, refazer=False):
+    """
+    Escolhe e aplica o número de threads intra-op mais rápido para o modelo nesta
+    máquina (o pool inter-op, sem uso aqui, é reduzido a 1 thread quando possível).
+
+    O modelo original não é alterado: as medições usam uma cópia e os geradores
+    aleatórios são restaurados ao final, então a reprodutibilidade do treino não muda.
+
+    Args:
+        modelo: Modelo (nn.Module) na CPU
+        formato_entrada: Formato do lote medido, ex.: (batch_size, 3, 224, 224)
+        treino: Se True mede forward + backward; se False, inferência
+        channels_last: Se o modelo será executado no formato channels_last
+        workers: Workers do DataLoader (cada um reserva um núcleo para a decodificação)
+        processos: Treinos ou processos simultâneos nesta máquina (dividem os núcleos)
+        passos: Passos medidos por candidato
+        caminho_cache: Arquivo JSON com as escolhas já feitas (None desativa o cache)
+        refazer: Se True ignora a escolha em cache e mede novamente
+
+    Returns:
+        int: Número de threads aplicado com torch.set_num_threads
+    """
+    _limitar_interop()
+    nucleos = os.cpu_count() or 1
+    maximo = max(1, (nucleos - workers) // processos)
+    chave = _chave_cache(modelo, formato_entrada, treino, channels_last, maximo)
+
+    cache = _ler_cache(caminho_cache)
+    if not refazer and chave in cache:
+        threads = cache[chave]['threads']
+        torch.set_num_threads(threads)
+        print(f"✓ Threads de cálculo: {threads} (escolha em cache para esta máquina e modelo)")
+        return threads
+
+    candidatos = candidatos_threads(maximo)
+    if len(candidatos) == 1:
+        torch.set_num_threads(maximo)
+        print(f"✓ Threads de cálculo: {maximo} (único valor possível)")
+        return maximo
+
+    print(f"Ajustando threads de cálculo (até {maximo} de {nucleos} núcleos)...")
+    threads_originais = torch.get_num_threads()
+    tempos = {}
+    with torch.random.fork_rng(devices=[]):
+        copia = copy.deepcopy(modelo).cpu().train(treino)
+        entrada = torch.randn(*formato_entrada)
+        if channels_last:
+            copia = copia.to(memory_format=torch.channels_last)
+            entrada = entrada.contiguous(memory_format=torch.channels_last)
+        try:
+            for threads in candidatos:
+                tempos[threads] = medir_threads(copia, entrada, threads, treino=treino, passos=passos)
+                print(f"  {threads:>3} thread(s): {tempos[threads] * 1000:8.1f} ms/passo")
+        except Exception as e:
+            print(f"⚠️  Aviso: Falha ao medir as threads, mantendo o padrão do PyTorch: {e}")
+            torch.set_num_threads(threads_originais)
+            return threads_originais
+
+    threads = min(tempos, key=tempos.get)
+    torch.set_num_threads(threads)
+    print(f"✓ Threads de cálculo: {threads}")
+
+    if caminho_cache:
+        cache[chave] = {'threads': threads, 'ms_por_passo': {str(t): s * 1000 for t, s in tempos.items()}}
+        _gravar_cache(cache, caminho_cache)
+    return threads
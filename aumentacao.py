@@ -0,0 +1,170 @@
+"""
+Módulo com aumentação de dados aplicada em lotes inteiros com operações de tensor.
+"""
+import math
+import torch
+import torch.nn.functional as F
+from data_loader_crops import MEDIA_NORMALIZACAO, DESVIO_NORMALIZACAO
+
+
+class AumentacaoLote:
+    """
+    Aumentação vetorizada para lotes de imagens de culturas.
+
+    Todas as transformações são sorteadas por amostra, mas executadas de uma vez
+    para o lote inteiro, no mesmo dispositivo do lote:
+    - recorte aleatório redimensionado e flips (um único grid_sample)
+    - variação de brilho, contraste e saturação
+    - mixup / cutmix entre amostras do lote
+
+    Recebe lotes uint8 em [0, 255] ou lotes float já normalizados e devolve sempre
+    lotes float normalizados, prontos para o modelo.
+    """
+
+    def __init__(self, num_classes, escala=(0.5, 1.0), proporcao=(3 / 4, 4 / 3),
+                 prob_flip_horizontal=0.5, prob_flip_vertical=0.0,
+                 brilho=0.2, contraste=0.2, saturacao=0.2,
+                 mixup_alpha=0.0, cutmix_alpha=0.0, prob_mistura=0.5):
+        """
+        Args:
+            num_classes: Número de classes (para os rótulos suaves do mixup/cutmix)
+            escala: Intervalo da fração da área original mantida no recorte
+            proporcao: Intervalo da proporção largura/altura do recorte
+            prob_flip_horizontal: Probabilidade de espelhar horizontalmente
+            prob_flip_vertical: Probabilidade de espelhar verticalmente
+            brilho: Variação máxima de brilho (fator em [1 - brilho, 1 + brilho])
+            contraste: Variação máxima de contraste
+            saturacao: Variação máxima de saturação
+            mixup_alpha: Parâmetro da distribuição Beta do mixup (0 desativa)
+            cutmix_alpha: Parâmetro da distribuição Beta do cutmix (0 desativa)
+            prob_mistura: Probabilidade de aplicar mixup/cutmix em um lote
+        """
+        self.num_classes = num_classes
+        self.escala = escala
+        self.proporcao = proporcao
+        self.prob_flip_horizontal = prob_flip_horizontal
+        self.prob_flip_vertical = prob_flip_vertical
+        self.brilho = brilho
+        self.contraste = contraste
+        self.saturacao = saturacao
+        self.mixup_alpha = mixup_alpha
+        self.cutmix_alpha = cutmix_alpha
+        self.prob_mistura = prob_mistura
+
+    def __call__(self, inputs, targets):
+        """
+        Aplica a aumentação a um lote.
+
+        Args:
+            inputs: Tensor [batch_size, 3, altura, largura] (uint8 ou float normalizado)
+            targets: Tensor [batch_size] com os índices das classes
+
+        Returns:
+            tuple: (lote float normalizado, alvos). Os alvos são os próprios índices ou,
+                   quando há mixup/cutmix, probabilidades com shape [batch_size, num_classes]
+        """
+        media = torch.tensor(MEDIA_NORMALIZACAO, device=inputs.device).view(1, -1, 1, 1)
+        desvio = torch.tensor(DESVIO_NORMALIZACAO, device=inputs.device).view(1, -1, 1, 1)
+
+        # Trabalhar com pixels em [0, 1]
+        if inputs.dtype == torch.uint8:
+            x = inputs.float().div_(255)
+        else:
+            x = inputs * desvio + media
+
+        x = self._recortar_e_espelhar(x)
+        x = self._variar_cores(x)
+        x = x.clamp_(0, 1).sub_(media).div_(desvio)
+
+        return self._misturar(x, targets)
+
+    def _uniforme(self, n, intervalo, device):
+        minimo, maximo = intervalo
+        return torch.empty(n, device=device).uniform_(minimo, maximo)
+
+    def _recortar_e_espelhar(self, x):
+        """Recorte aleatório redimensionado e flips em uma única amostragem por grade."""
+        n = x.size(0)
+        device = x.device
+
+        area = self._uniforme(n, self.escala, device)
+        # Proporção sorteada em escala logarítmica (3/4 e 4/3 igualmente prováveis)
+        log_proporcao = self._uniforme(n, (math.log(self.proporcao[0]), math.log(self.proporcao[1])), device)
+        proporcao = torch.exp(log_proporcao)
+
+        # Largura e altura do recorte como fração da imagem (limitadas a 1)
+        largura = torch.sqrt(area * proporcao).clamp_(max=1.0)
+        altura = torch.sqrt(area / proporcao).clamp_(max=1.0)
+
+        # Centro do recorte em coordenadas normalizadas [-1, 1]
+        centro_x = (torch.rand(n, device=device) * 2 - 1) * (1 - largura)
+        centro_y = (torch.rand(n, device=device) * 2 - 1) * (1 - altura)
+
+        sinal_x = torch.where(torch.rand(n, device=device) < self.prob_flip_horizontal, -1.0, 1.0)
+        sinal_y = torch.where(torch.rand(n, device=device) < self.prob_flip_vertical, -1.0, 1.0)
+
+        theta = torch.zeros(n, 2, 3, device=device)
+        theta[:, 0, 0] = largura * sinal_x
+        theta[:, 0, 2] = centro_x
+        theta[:, 1, 1] = altura * sinal_y
+        theta[:, 1, 2] = centro_y
+
+        grade = F.affine_grid(theta, list(x.shape), align_corners=False)
+        return F.grid_sample(x, grade, mode='bilinear', padding_mode='reflection', align_corners=False)
+
+    def _variar_cores(self, x):
+        """Variação de brilho, contraste e saturação sorteada por amostra."""
+        n = x.size(0)
+        device = x.device
+        forma = (n, 1, 1, 1)
+        pesos_cinza = torch.tensor([0.299, 0.587, 0.114], device=device).view(1, 3, 1, 1)
+
+        if self.brilho > 0:
+            x = x * self._uniforme(n, (1 - self.brilho, 1 + self.brilho), device).view(forma)
+
+        if self.contraste > 0:
+            fator = self._uniforme(n, (1 - self.contraste, 1 + self.contraste), device).view(forma)
+            media_cinza = (x * pesos_cinza).sum(dim=1, keepdim=True).mean(dim=(2, 3), keepdim=True)
+            x = (x - media_cinza) * fator + media_cinza
+
+        if self.saturacao > 0:
+            fator = self._uniforme(n, (1 - self.saturacao, 1 + self.saturacao), device).view(forma)
+            cinza = (x * pesos_cinza).sum(dim=1, keepdim=True)
+            x = (x - cinza) * fator + cinza
+
+        return x
+
+    def _misturar(self, x, targets):
+        """Aplica mixup ou cutmix ao lote, com probabilidade prob_mistura."""
+        metodos = []
+        if self.mixup_alpha > 0:
+            metodos.append('mixup')
+        if self.cutmix_alpha > 0:
+            metodos.append('cutmix')
+
+        if not metodos or torch.rand(1).item() >= self.prob_mistura:
+            return x, targets
+
+        metodo = metodos[torch.randint(len(metodos), (1,)).item()]
+        alpha = self.mixup_alpha if metodo == 'mixup' else self.cutmix_alpha
+        lam = torch.distributions.Beta(alpha, alpha).sample().item()
+        permutacao = torch.randperm(x.size(0), device=x.device)
+
+        if metodo == 'mixup':
+            x = x * lam + x[permutacao] * (1 - lam)
+        else:
+            altura, largura = x.shape[2], x.shape[3]
+            corte_h = int(altura * (1 - lam) ** 0.5)
+            corte_w = int(largura * (1 - lam) ** 0.5)
+            cy = torch.randint(altura, (1,)).item()
+            cx = torch.randint(largura, (1,)).item()
+            y1, y2 = max(cy - corte_h // 2, 0), min(cy + corte_h // 2, altura)
+            x1, x2 = max(cx - corte_w // 2, 0), min(cx + corte_w // 2, largura)
+            x = x.clone()
+            x[:, :, y1:y2, x1:x2] = x[permutacao, :, y1:y2, x1:x2]
+            # Ajustar lambda para a área efetivamente recortada
+            lam = 1 - (y2 - y1) * (x2 - x1) / (altura * largura)
+
+        alvos = F.one_hot(targets, self.num_classes).float()
+        alvos = alvos * lam + alvos[permutacao] * (1 - lam)
+        return x, alvos
@@ -0,0 +1,110 @@
+"""
+Script para comparar a decodificação completa com a decodificação JPEG em escala reduzida.
+
+Para cada tamanho alvo (32x32 do modelo de pássaros e 224x224 do modelo de culturas)
+mede imagens/segundo nos dois caminhos e a diferença de pixels entre os resultados.
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+import torch
+from torchvision import transforms
+from decodificacao import abrir_imagem
+
+
+def listar_imagens(caminho_dataset, max_imagens):
+    """
+    Lista imagens JPEG do dataset de culturas.
+
+    Args:
+        caminho_dataset: Caminho para a pasta Agricultural-crops
+        max_imagens: Número máximo de imagens
+
+    Returns:
+        Lista de caminhos
+    """
+    caminhos = sorted(
+        str(p) for p in Path(caminho_dataset).rglob('*')
+        if p.suffix.lower() in ('.jpg', '.jpeg')
+    )
+    return caminhos[:max_imagens]
+
+
+def decodificar_todas(caminhos, transform, tamanho_reduzido):
+    """
+    Decodifica e redimensiona todas as imagens, medindo o tempo.
+
+    Returns:
+        tuple: (tensor com as imagens, tempo em segundos)
+    """
+    inicio = time.perf_counter()
+    tensores = [transform(abrir_imagem(c, tamanho_reduzido)) for c in caminhos]
+    tempo = time.perf_counter() - inicio
+    return torch.stack(tensores), tempo
+
+
+def comparar(caminhos, tamanho, repeticoes):
+    """
+    Compara os dois caminhos de decodificação para um tamanho alvo.
+
+    Returns:
+        dict: Vazões (imagens/s) e diferenças de pixel na escala 0-255
+    """
+    # Sem normalização: a diferença é medida diretamente nos valores de pixel
+    transform = transforms.Compose([
+        transforms.Resize((tamanho, tamanho)),
+        transforms.ToTensor()
+    ])
+
+    tempos_completo = []
+    tempos_reduzido = []
+    for _ in range(repeticoes):
+        completo, tempo = decodificar_todas(caminhos, transform, None)
+        tempos_completo.append(tempo)
+        reduzido, tempo = decodificar_todas(caminhos, transform, (tamanho, tamanho))
+        tempos_reduzido.append(tempo)
+
+    diferenca = (completo - reduzido).abs() * 255
+    return {
+        'completo': len(caminhos) / min(tempos_completo),
+        'reduzido': len(caminhos) / min(tempos_reduzido),
+        'diferenca_media': diferenca.mean().item(),
+        'diferenca_p99': torch.quantile(diferenca.flatten()[:1_000_000], 0.99).item(),
+        'diferenca_max': diferenca.max().item()
+    }
+
+
+def main():
+    """Executa o benchmark e imprime a tabela de resultados."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--dataset', default='Agricultural-crops',
+                        help='Pasta com as imagens (padrão: Agricultural-crops)')
+    parser.add_argument('--max-imagens', type=int, default=200,
+                        help='Número de imagens usadas no benchmark (padrão: 200)')
+    parser.add_argument('--repeticoes', type=int, default=3,
+                        help='Repetições de cada medição; vale a mais rápida (padrão: 3)')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[32, 224],
+                        help='Tamanhos alvo (padrão: 32 224)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.dataset):
+        print(f"❌ ERRO: Pasta '{args.dataset}' não encontrada!")
+        return
+
+    caminhos = listar_imagens(args.dataset, args.max_imagens)
+    print(f"Imagens JPEG usadas: {len(caminhos)} (melhor de {args.repeticoes} repetições)\n")
+
+    print(f"{'Tamanho':<10} {'Completo':>14} {'Reduzido':>14} {'Ganho':>8} "
+          f"{'Dif. média':>11} {'Dif. p99':>9} {'Dif. máx':>9}")
+    print("-" * 80)
+    for tamanho in args.tamanhos:
+        r = comparar(caminhos, tamanho, args.repeticoes)
+        print(f"{f'{tamanho}x{tamanho}':<10} {r['completo']:>10.1f} i/s {r['reduzido']:>10.1f} i/s "
+              f"{r['reduzido'] / r['completo']:>7.2f}x {r['diferenca_media']:>11.2f} "
+              f"{r['diferenca_p99']:>9.1f} {r['diferenca_max']:>9.1f}")
+    print("\nDiferenças de pixel na escala 0-255.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Script para medir a escalabilidade do treino distribuído na CPU (treino_distribuido.py).
+
+Treina o modelo de culturas por algumas épocas com 1, 2, 4 e 8 processos, sempre com
+o mesmo lote global e os mesmos pesos iniciais, e imprime o tempo médio por época, a
+vazão e a eficiência de escala de cada configuração em relação a 1 processo.
+"""
+import argparse
+import copy
+import os
+import tempfile
+import torch
+from model_crops import RedeCnnCulturasAgricolas
+from data_loader_crops import preparar_datasets
+from treino_distribuido import treinar_rede_distribuido
+
+
+def medir(modelo, dataset_treino, dataset_validacao, processos, args):
+    """
+    Treina com um número de processos e mede o tempo por época.
+
+    Returns:
+        float: Tempo médio por época, em segundos, ignorando a primeira (aquecimento)
+    """
+    _, historico = treinar_rede_distribuido(
+        copy.deepcopy(modelo), dataset_treino, dataset_validacao,
+        num_processos=processos,
+        epochs=args.epocas,
+        batch_size=args.batch_size,
+        learning_rate=0.001
+    )
+    tempos = historico['tempo_epoch']
+    tempos = tempos[1:] if len(tempos) > 1 else tempos
+    return sum(tempos) / len(tempos)
+
+
+def main():
+    """Executa o benchmark e imprime a tabela de eficiência."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--dataset', default='Agricultural-crops',
+                        help='Pasta com as imagens (padrão: Agricultural-crops)')
+    parser.add_argument('--processos', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Números de processos a medir (padrão: 1 2 4 8)')
+    parser.add_argument('--epocas', type=int, default=3,
+                        help='Épocas por medição; a primeira é descartada (padrão: 3)')
+    parser.add_argument('--batch-size', type=int, default=64,
+                        help='Lote global, dividido entre os processos (padrão: 64)')
+    parser.add_argument('--tamanho', type=int, default=224, help='Tamanho das imagens (padrão: 224)')
+    parser.add_argument('--treino', type=int, default=20, help='Imagens de treino por classe')
+    parser.add_argument('--validacao', type=int, default=12, help='Imagens de validação por classe')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.dataset):
+        print(f"❌ ERRO: Pasta '{args.dataset}' não encontrada!")
+        return
+
+    dataset_treino, dataset_validacao, classes = preparar_datasets(
+        args.dataset,
+        tamanho_imagem=args.tamanho,
+        imagens_treino=args.treino,
+        imagens_validacao=args.validacao,
+        armazenamento='uint8'
+    )
+    torch.manual_seed(0)
+    modelo = RedeCnnCulturasAgricolas(num_classes=len(classes))
+    imagens_por_epoca = len(dataset_treino) + len(dataset_validacao)
+
+    # O treino grava o melhor modelo no diretório atual; o benchmark não deve
+    # sobrescrever o modelo do projeto
+    diretorio_original = os.getcwd()
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix='benchmark_distribuido_') as diretorio_temp:
+        os.chdir(diretorio_temp)
+        try:
+            for processos in args.processos:
+                print(f"\n{'='*70}\nMEDINDO {processos} PROCESSO(S)\n{'='*70}")
+                resultados.append((processos, medir(modelo, dataset_treino, dataset_validacao, processos, args)))
+        finally:
+            os.chdir(diretorio_original)
+
+    nucleos = os.cpu_count() or 1
+    tempo_base = next((t for p, t in resultados if p == 1), None)
+    print(f"\nNúcleos: {nucleos}, lote global: {args.batch_size}, "
+          f"imagens por época: {imagens_por_epoca} (treino + validação)\n")
+    print(f"{'Processos':>10} {'Threads/proc':>13} {'Tempo/época':>12} {'Imagens/s':>10} "
+          f"{'Speedup':>8} {'Eficiência':>11}")
+    print("-" * 70)
+    for processos, tempo in resultados:
+        threads = max(1, nucleos // processos)
+        if tempo_base is not None:
+            speedup = tempo_base / tempo
+            colunas = f"{speedup:>7.2f}x {100 * speedup / processos:>10.1f}%"
+        else:
+            colunas = f"{'-':>8} {'-':>11}"
+        print(f"{processos:>10} {threads:>13} {tempo:>11.2f}s {imagens_por_epoca / tempo:>10.1f} {colunas}")
+    print("\nEficiência = speedup / processos (100% = escala linear).")
+
+
+if __name__ == "__main__":
+    main()
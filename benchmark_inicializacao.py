@@ -0,0 +1,136 @@
+"""
+Script para medir o tempo de inicialização da classificação de uma imagem.
+
+Cada medição roda em um processo Python novo (as importações ficam em cache dentro de
+um processo) e separa o tempo em: interpretador, importações, carga do modelo,
+preprocessamento e forward. Preprocessamento e forward são medidos duas vezes, para
+mostrar o custo da primeira chamada e o de uma chamada já aquecida.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ETAPAS = [
+    ('interpretador', 'Interpretador Python'),
+    ('importacoes', 'Importações (torch, torchvision, modelo)'),
+    ('carga_modelo', 'Carga do modelo'),
+    ('preprocessamento', 'Preprocessamento (1ª imagem)'),
+    ('preprocessamento_seguinte', 'Preprocessamento (imagens seguintes)'),
+    ('forward', 'Forward (1ª imagem)'),
+    ('forward_seguinte', 'Forward (imagens seguintes)'),
+]
+
+
+def medir_etapas(imagem, caminho_modelo):
+    """
+    Mede as etapas da classificação no processo atual (executado pelo processo filho).
+
+    Returns:
+        dict: Segundos gastos em cada etapa, exceto 'interpretador'
+    """
+    tempos = {}
+    inicio = time.perf_counter()
+    # classificar_imagem só importa torch, torchvision e o modelo quando são usados;
+    # aqui eles são importados de uma vez para entrar nesta etapa
+    import classificar_imagem
+    import torch
+    import torchvision.transforms
+    import model_crops
+    tempos['importacoes'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    modelo = classificar_imagem.carregar_modelo(caminho_modelo, device='cpu')
+    tempos['carga_modelo'] = time.perf_counter() - inicio
+
+    for etapa in ('preprocessamento', 'preprocessamento_seguinte'):
+        inicio = time.perf_counter()
+        tensor = classificar_imagem.preprocessar_imagem(imagem)
+        tempos[etapa] = time.perf_counter() - inicio
+
+    for etapa in ('forward', 'forward_seguinte'):
+        inicio = time.perf_counter()
+        with torch.no_grad():
+            torch.softmax(modelo(tensor), dim=1)
+        tempos[etapa] = time.perf_counter() - inicio
+    return tempos
+
+
+def executar_medicao(imagem, caminho_modelo):
+    """
+    Executa uma medição em um processo novo.
+
+    Returns:
+        dict: Segundos de cada etapa, incluindo 'interpretador' (tempo total do processo
+              menos as etapas medidas dentro dele) e 'total'
+    """
+    inicio = time.perf_counter()
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--interno', imagem, caminho_modelo],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    ).stdout
+    total = time.perf_counter() - inicio
+    tempos = json.loads(saida.strip().splitlines()[-1])
+    tempos['interpretador'] = total - sum(tempos.values())
+    tempos['total'] = total
+    return tempos
+
+
+def main():
+    """Executa as medições e imprime a mediana de cada etapa."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('imagem', nargs='?', default='gato.jpeg', help='Imagem classificada (padrão: gato.jpeg)')
+    parser.add_argument('modelo', nargs='?', default='modelo_final_culturas.pth',
+                        help='Modelo (padrão: modelo_final_culturas.pth; pesos aleatórios se não existir)')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Processos medidos (padrão: 5)')
+    parser.add_argument('--interno', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        # Apenas a última linha da saída é lida pelo processo pai
+        print(json.dumps(medir_etapas(args.imagem, args.modelo)))
+        return
+
+    imagem = os.path.abspath(args.imagem)
+    if not os.path.exists(imagem):
+        print(f"❌ ERRO: Imagem não encontrada: {args.imagem}")
+        return
+
+    diretorio_temp = None
+    caminho_modelo = os.path.abspath(args.modelo)
+    if not os.path.exists(caminho_modelo):
+        # O tempo de carga depende só do tamanho dos pesos, não do treino
+        import torch
+        from model_crops import RedeCnnCulturasAgricolas
+        print(f"⚠️  Aviso: Modelo '{args.modelo}' não encontrado. Usando pesos aleatórios.")
+        diretorio_temp = tempfile.TemporaryDirectory(prefix='benchmark_inicializacao_')
+        caminho_modelo = os.path.join(diretorio_temp.name, 'modelo.pth')
+        torch.save(RedeCnnCulturasAgricolas(num_classes=30).state_dict(), caminho_modelo)
+
+    try:
+        medicoes = []
+        for i in range(args.repeticoes):
+            medicoes.append(executar_medicao(imagem, caminho_modelo))
+            print(f"Medição {i + 1}/{args.repeticoes}: {medicoes[-1]['total']:.2f}s")
+    finally:
+        if diretorio_temp is not None:
+            diretorio_temp.cleanup()
+
+    total = statistics.median(m['total'] for m in medicoes)
+    print(f"\n{'Etapa':<42} {'Mediana':>10} {'% do total':>11}")
+    print("-" * 65)
+    for chave, nome in ETAPAS:
+        mediana = statistics.median(m[chave] for m in medicoes)
+        print(f"{nome:<42} {mediana * 1000:>8.1f}ms {100 * mediana / total:>10.1f}%")
+    print("-" * 65)
+    print(f"{'Total do processo':<42} {total * 1000:>8.1f}ms")
+    print("\nAs etapas 'seguintes' mostram o custo de mais uma imagem com tudo já carregado.")
+
+
+if __name__ == "__main__":
+    main()
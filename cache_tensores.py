@@ -0,0 +1,309 @@
+"""
+Módulo para manter em disco um cache das imagens já decodificadas e redimensionadas.
+"""
+import os
+import json
+import hashlib
+import numpy as np
+import torch
+
+
+class ManifestoConteudo:
+    """
+    Manifesto com o hash SHA-256 do conteúdo de cada arquivo do dataset.
+
+    Fica na mesma pasta do cache de tensores e é compartilhado por todas as
+    configurações de pré-processamento. O hash de um arquivo só é recalculado
+    quando o tamanho ou a data de modificação mudam; arquivos que deixaram de
+    existir são removidos na próxima atualização.
+    """
+
+    NOME_ARQUIVO = 'manifesto.json'
+
+    def __init__(self, diretorio):
+        """
+        Args:
+            diretorio: Pasta onde o manifesto é mantido
+        """
+        self.diretorio = diretorio
+        self.caminho = os.path.join(diretorio, self.NOME_ARQUIVO)
+        self.arquivos = {}  # caminho absoluto -> {'tamanho', 'mtime_ns', 'sha256'}
+        self.alterado = False
+
+        if os.path.exists(self.caminho):
+            try:
+                with open(self.caminho, 'r', encoding='utf-8') as f:
+                    self.arquivos = json.load(f)['arquivos']
+            except Exception as e:
+                print(f"⚠️  Aviso: Não foi possível ler o manifesto, será recriado: {e}")
+                self.arquivos = {}
+
+    @staticmethod
+    def calcular_hash(caminho):
+        """Calcula o SHA-256 do conteúdo de um arquivo."""
+        sha = hashlib.sha256()
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(bloco)
+        return sha.hexdigest()
+
+    def hash(self, caminho):
+        """
+        Retorna o hash do conteúdo de um arquivo, recalculando apenas se ele mudou.
+
+        Args:
+            caminho: Caminho para o arquivo
+
+        Returns:
+            str: SHA-256 do conteúdo
+        """
+        caminho = os.path.abspath(caminho)
+        info = os.stat(caminho)
+        registro = self.arquivos.get(caminho)
+        if registro and registro['tamanho'] == info.st_size and registro['mtime_ns'] == info.st_mtime_ns:
+            return registro['sha256']
+
+        self.arquivos[caminho] = {
+            'tamanho': info.st_size,
+            'mtime_ns': info.st_mtime_ns,
+            'sha256': self.calcular_hash(caminho)
+        }
+        self.alterado = True
+        return self.arquivos[caminho]['sha256']
+
+    def atualizar(self, caminhos):
+        """
+        Sincroniza o manifesto com a lista atual de arquivos do dataset.
+
+        Args:
+            caminhos: Todos os arquivos que fazem parte do dataset
+
+        Returns:
+            dict: Contagem de arquivos 'novos', 'alterados', 'removidos' e 'inalterados'
+        """
+        atuais = {os.path.abspath(c) for c in caminhos}
+        contagem = {'novos': 0, 'alterados': 0, 'removidos': 0, 'inalterados': 0}
+
+        for caminho in sorted(atuais):
+            anterior = self.arquivos.get(caminho, {}).get('sha256')
+            if self.hash(caminho) == anterior:
+                contagem['inalterados'] += 1
+            elif anterior is None:
+                contagem['novos'] += 1
+            else:
+                contagem['alterados'] += 1
+
+        for caminho in [c for c in self.arquivos if c not in atuais]:
+            del self.arquivos[caminho]
+            contagem['removidos'] += 1
+            self.alterado = True
+
+        return contagem
+
+    def hashes_atuais(self):
+        """Retorna o conjunto de hashes dos arquivos registrados."""
+        return {registro['sha256'] for registro in self.arquivos.values()}
+
+    def salvar(self):
+        """Grava o manifesto em disco, se houve alguma alteração."""
+        if not self.alterado:
+            return
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho_temp = self.caminho + '.tmp'
+        with open(caminho_temp, 'w', encoding='utf-8') as f:
+            json.dump({'arquivos': self.arquivos}, f)
+        os.replace(caminho_temp, self.caminho)
+        self.alterado = False
+
+
+class CacheTensores:
+    """
+    Cache persistente de tensores pré-processados.
+
+    Para cada configuração de pré-processamento (tamanho da imagem, normalização,
+    decodificação reduzida e tipo de armazenamento) o cache guarda um único arquivo
+    .npy contíguo com todas as imagens e um índice JSON que associa a chave de cada
+    arquivo (o SHA-256 do seu conteúdo, mantido pelo ManifestoConteudo) à linha
+    correspondente. Em uma execução seguinte o arquivo .npy é aberto com
+    memory-map, evitando decodificar as imagens novamente.
+    """
+
+    # Versão 2: chaves passaram de caminho|tamanho|mtime para o SHA-256 do conteúdo
+    VERSAO = 2
+
+    def __init__(self, diretorio, tamanho_imagem, normalizar=True, decodificacao_reduzida=False,
+                 armazenamento='float32', manifesto=None):
+        """
+        Args:
+            diretorio: Pasta onde os arquivos do cache são mantidos
+            tamanho_imagem: Tamanho usado no redimensionamento das imagens
+            normalizar: Se as imagens foram normalizadas antes de entrar no cache
+            decodificacao_reduzida: Se os JPEGs foram decodificados em escala reduzida
+            armazenamento: Tipo dos tensores guardados ('float32' ou 'uint8')
+            manifesto: ManifestoConteudo compartilhado (None cria um na mesma pasta)
+        """
+        self.diretorio = diretorio
+        self.manifesto = manifesto if manifesto is not None else ManifestoConteudo(diretorio)
+        self.parametros = {
+            'tamanho_imagem': tamanho_imagem,
+            'normalizar': bool(normalizar),
+            'decodificacao_reduzida': bool(decodificacao_reduzida),
+            'armazenamento': armazenamento
+        }
+
+        if armazenamento == 'uint8':
+            nome = f"culturas_{tamanho_imagem}px_uint8"
+        else:
+            nome = f"culturas_{tamanho_imagem}px_{'norm' if normalizar else 'bruto'}"
+        if decodificacao_reduzida:
+            nome += '_dct'
+        self.caminho_dados = os.path.join(diretorio, nome + '.npy')
+        self.caminho_indice = os.path.join(diretorio, nome + '.json')
+
+        self.entradas = {}  # chave -> linha no arquivo .npy
+        self.dados = None   # array aberto com memory-map
+        self.novos = {}     # chave -> array ainda não gravado em disco
+        self.acertos = 0
+        self.faltas = 0
+
+        self._carregar()
+
+    def chave_arquivo(self, caminho):
+        """
+        Gera a chave de um arquivo a partir do hash do seu conteúdo.
+
+        Args:
+            caminho: Caminho para o arquivo de imagem
+
+        Returns:
+            str: Chave usada no índice do cache
+        """
+        return self.manifesto.hash(caminho)
+
+    def _carregar(self):
+        """Abre o índice e o arquivo de dados existentes, se forem compatíveis."""
+        if not (os.path.exists(self.caminho_indice) and os.path.exists(self.caminho_dados)):
+            return
+
+        try:
+            with open(self.caminho_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+
+            if indice.get('versao') != self.VERSAO or indice.get('parametros') != self.parametros:
+                print("⚠️  Aviso: Cache de tensores incompatível, será recriado")
+                return
+
+            # mmap_mode='c' (copy-on-write) evita cópias e não altera o arquivo
+            dados = np.load(self.caminho_dados, mmap_mode='c')
+            if len(dados) != indice['total']:
+                print("⚠️  Aviso: Cache de tensores corrompido, será recriado")
+                return
+
+            self.dados = dados
+            self.entradas = indice['entradas']
+        except Exception as e:
+            print(f"⚠️  Aviso: Não foi possível ler o cache de tensores: {e}")
+            self.dados = None
+            self.entradas = {}
+
+    def obter(self, caminho):
+        """
+        Busca no cache o tensor de um arquivo.
+
+        Args:
+            caminho: Caminho para o arquivo de imagem
+
+        Returns:
+            Tensor da imagem ou None se o arquivo não estiver no cache
+        """
+        chave = self.chave_arquivo(caminho)
+
+        if chave in self.novos:
+            self.acertos += 1
+            return torch.from_numpy(self.novos[chave])
+
+        linha = self.entradas.get(chave)
+        if linha is None:
+            self.faltas += 1
+            return None
+
+        self.acertos += 1
+        return torch.from_numpy(self.dados[linha])
+
+    def guardar(self, caminho, tensor):
+        """
+        Adiciona ao cache o tensor de um arquivo recém-decodificado.
+
+        Args:
+            caminho: Caminho para o arquivo de imagem
+            tensor: Tensor da imagem já pré-processada
+        """
+        self.novos[self.chave_arquivo(caminho)] = tensor.numpy()
+
+    def salvar(self):
+        """
+        Grava em disco as entradas novas junto com as já existentes.
+
+        Entradas cujo conteúdo não pertence mais a nenhum arquivo do manifesto
+        (arquivos apagados ou modificados) são descartadas. A escrita é feita em
+        arquivos temporários que substituem os anteriores apenas no final.
+        """
+        self.manifesto.salvar()
+
+        validos = self.manifesto.hashes_atuais()
+        antigas = [
+            (chave, linha) for chave, linha in self.entradas.items()
+            if chave in validos and chave not in self.novos
+        ]
+        if not self.novos and len(antigas) == len(self.entradas):
+            return
+
+        if not self.novos and not antigas:
+            for caminho in (self.caminho_dados, self.caminho_indice):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+            self.dados = None
+            self.entradas = {}
+            return
+
+        primeiro = next(iter(self.novos.values())) if self.novos else self.dados[antigas[0][1]]
+        total = len(antigas) + len(self.novos)
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho_temp = self.caminho_dados + '.tmp.npy'
+        saida = np.lib.format.open_memmap(
+            caminho_temp, mode='w+', dtype=primeiro.dtype, shape=(total,) + primeiro.shape
+        )
+
+        entradas = {}
+        linha = 0
+        for chave, linha_antiga in antigas:
+            saida[linha] = self.dados[linha_antiga]
+            entradas[chave] = linha
+            linha += 1
+        for chave, array in self.novos.items():
+            saida[linha] = array
+            entradas[chave] = linha
+            linha += 1
+
+        saida.flush()
+        del saida
+
+        # Fechar o memory-map atual antes de substituir o arquivo (necessário no Windows)
+        self.dados = None
+        os.replace(caminho_temp, self.caminho_dados)
+
+        indice = {
+            'versao': self.VERSAO,
+            'parametros': self.parametros,
+            'total': total,
+            'entradas': entradas
+        }
+        caminho_indice_temp = self.caminho_indice + '.tmp'
+        with open(caminho_indice_temp, 'w', encoding='utf-8') as f:
+            json.dump(indice, f)
+        os.replace(caminho_indice_temp, self.caminho_indice)
+
+        self.entradas = entradas
+        self.novos = {}
+        self.dados = np.load(self.caminho_dados, mmap_mode='c')
@@ -0,0 +1,256 @@
+"""
+Módulo para gravar checkpoints em disco sem bloquear o treinamento e para
+salvar/restaurar o estado completo de um treino interrompido.
+"""
+import json
+import os
+import random
+import threading
+import numpy as np
+import torch
+
+
+def copiar_para_cpu(objeto):
+    """
+    Copia recursivamente os tensores de um state_dict (ou de dicionários e listas
+    aninhados) para a memória da CPU.
+
+    A cópia é necessária mesmo quando o modelo já está na CPU: o otimizador altera
+    os parâmetros no lugar enquanto o arquivo ainda está sendo gravado.
+
+    Args:
+        objeto: Tensor, dicionário, lista ou tupla
+
+    Returns:
+        Estrutura equivalente com tensores independentes na CPU
+    """
+    if isinstance(objeto, torch.Tensor):
+        return objeto.detach().to('cpu', copy=True)
+    if isinstance(objeto, dict):
+        return type(objeto)((chave, copiar_para_cpu(valor)) for chave, valor in objeto.items())
+    if isinstance(objeto, (list, tuple)):
+        return type(objeto)(copiar_para_cpu(valor) for valor in objeto)
+    return objeto
+
+
+class EscritorCheckpoint:
+    """
+    Grava checkpoints em uma thread de fundo.
+
+    O treinamento só paga o custo de copiar o estado para a memória da CPU; a escrita
+    em disco acontece fora do laço de épocas. Há no máximo uma escrita em andamento:
+    se um novo checkpoint para o mesmo arquivo chega enquanto outro ainda espera a
+    vez, o mais antigo é descartado, porque já foi superado. Cada arquivo é gravado
+    com um nome temporário e depois substituído com os.replace, então nunca fica um
+    checkpoint pela metade.
+    """
+
+    def __init__(self):
+        self._condicao = threading.Condition()
+        self._pendentes = {}       # caminho -> (estado, caminho_alternativo) aguardando escrita
+        self._escrevendo = False
+        self._fechado = False
+        self._thread = None
+        self.ultimos_caminhos = {}  # caminho pedido -> arquivo efetivamente gravado
+        self.descartados = 0
+
+    def salvar(self, estado, caminho, caminho_alternativo=None, info=None):
+        """
+        Agenda a gravação de um checkpoint e retorna imediatamente.
+
+        Args:
+            estado: state_dict (ou dicionário com vários state_dicts) a ser gravado
+            caminho: Arquivo de destino
+            caminho_alternativo: Arquivo usado se a gravação em 'caminho' falhar
+            info: Dicionário opcional gravado em JSON ao lado do arquivo (ver
+                  caminho_info), só depois que o estado foi gravado com sucesso
+        """
+        snapshot = copiar_para_cpu(estado)
+
+        with self._condicao:
+            if self._fechado:
+                raise RuntimeError("EscritorCheckpoint já foi fechado")
+            if caminho in self._pendentes:
+                self.descartados += 1
+            self._pendentes[caminho] = (snapshot, caminho_alternativo, info)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name='escritor-checkpoint', daemon=True)
+                self._thread.start()
+            self._condicao.notify_all()
+
+    def _executar(self):
+        """Laço da thread de fundo."""
+        while True:
+            with self._condicao:
+                while not self._pendentes and not self._fechado:
+                    self._condicao.wait()
+                if not self._pendentes:
+                    return
+                caminho = next(iter(self._pendentes))
+                estado, caminho_alternativo, info = self._pendentes.pop(caminho)
+                self._escrevendo = True
+
+            try:
+                self._gravar(estado, caminho, caminho_alternativo, info)
+            finally:
+                with self._condicao:
+                    self._escrevendo = False
+                    self._condicao.notify_all()
+
+    def _gravar(self, estado, caminho, caminho_alternativo, info=None):
+        """Grava um checkpoint de forma atômica, tentando o nome alternativo se falhar."""
+        try:
+            caminho_temp = caminho + '.tmp'
+            torch.save(estado, caminho_temp)
+            os.replace(caminho_temp, caminho)
+            self.ultimos_caminhos[caminho] = caminho
+            self._gravar_info(info, caminho)
+        except Exception as e:
+            print(f"⚠️  Aviso: Não foi possível salvar o checkpoint em '{caminho}': {e}")
+            if caminho_alternativo is None:
+                return
+            print("   Tentando salvar com nome alternativo...")
+            try:
+                torch.save(estado, caminho_alternativo)
+                self.ultimos_caminhos[caminho] = caminho_alternativo
+                print(f"   ✓ Checkpoint salvo em '{caminho_alternativo}'")
+            except Exception as e2:
+                print(f"   ❌ Erro ao salvar checkpoint alternativo: {e2}")
+                return
+            self._gravar_info(info, caminho_alternativo)
+
+    def _gravar_info(self, info, caminho):
+        """Grava o JSON de informações de um checkpoint já gravado."""
+        if info is None:
+            return
+        try:
+            caminho_json = caminho_info(caminho)
+            with open(caminho_json + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(info, f, indent=2)
+            os.replace(caminho_json + '.tmp', caminho_json)
+        except OSError as e:
+            print(f"⚠️  Aviso: Não foi possível salvar as informações de '{caminho}': {e}")
+
+    def aguardar(self):
+        """Bloqueia até que todos os checkpoints agendados tenham sido gravados."""
+        with self._condicao:
+            while self._pendentes or self._escrevendo:
+                self._condicao.wait()
+
+    def fechar(self):
+        """Espera as gravações pendentes e encerra a thread de fundo."""
+        self.aguardar()
+        with self._condicao:
+            self._fechado = True
+            self._condicao.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+def caminho_info(caminho):
+    """
+    Retorna o arquivo JSON com as informações gravadas junto de um checkpoint.
+
+    Args:
+        caminho: Arquivo do checkpoint (ex.: 'melhor_modelo_culturas.pth')
+
+    Returns:
+        str: Caminho do JSON (ex.: 'melhor_modelo_culturas_info.json')
+    """
+    return f"{os.path.splitext(caminho)[0]}_info.json"
+
+
+def ler_info(caminho):
+    """
+    Lê as informações gravadas junto de um checkpoint (ver EscritorCheckpoint.salvar).
+
+    Args:
+        caminho: Arquivo do checkpoint
+
+    Returns:
+        dict com as informações ou None se não existirem ou não puderem ser lidas
+    """
+    caminho_json = caminho_info(caminho)
+    if not os.path.exists(caminho_json):
+        return None
+    try:
+        with open(caminho_json, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️  Aviso: Não foi possível ler '{caminho_json}': {e}")
+        return None
+
+
+def definir_semente(semente):
+    """
+    Inicializa os geradores aleatórios do Python, do NumPy e do PyTorch.
+
+    Args:
+        semente: Semente inteira
+    """
+    random.seed(semente)
+    np.random.seed(semente % 2**32)
+    torch.manual_seed(semente)
+
+
+def capturar_estado_rng():
+    """
+    Captura o estado de todos os geradores aleatórios usados no treino
+    (embaralhamento do DataLoader, dropout, aumentação de dados).
+
+    Returns:
+        dict: Estados do Python, do NumPy, do PyTorch na CPU e, se houver, das GPUs
+    """
+    estado = {
+        'python': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state()
+    }
+    if torch.cuda.is_available():
+        estado['cuda'] = torch.cuda.get_rng_state_all()
+    return estado
+
+
+def restaurar_estado_rng(estado):
+    """
+    Restaura os geradores aleatórios a partir de capturar_estado_rng.
+
+    Args:
+        estado: Dicionário retornado por capturar_estado_rng
+    """
+    random.setstate(estado['python'])
+    np.random.set_state(estado['numpy'])
+    torch.set_rng_state(estado['torch'])
+    if 'cuda' in estado and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(estado['cuda'])
+
+
+def carregar_checkpoint(caminho):
+    """
+    Carrega um checkpoint de treino completo.
+
+    Args:
+        caminho: Arquivo gravado durante o treino
+
+    Returns:
+        dict com o checkpoint ou None se o arquivo não existir ou não puder ser lido
+    """
+    if not os.path.exists(caminho):
+        print(f"⚠️  Aviso: Checkpoint '{caminho}' não encontrado, o treino começará do início")
+        return None
+
+    try:
+        # O checkpoint contém objetos Python (histórico, estados dos geradores),
+        # não apenas tensores; só carregue arquivos gerados pelo próprio projeto
+        return torch.load(caminho, map_location='cpu', weights_only=False)
+    except Exception as e:
+        print(f"⚠️  Aviso: Não foi possível ler o checkpoint '{caminho}': {e}")
+        print("   O treino começará do início")
+        return None
@@ -1,13 +1,24 @@
 """
-Script para classificar uma imagem individual usando o modelo treinado.
+Script para classificar imagens usando o modelo treinado: uma imagem individual ou,
+no modo em lote, uma pasta, um padrão glob ou uma lista de arquivos.
+
+PyTorch, torchvision, PIL e os módulos do projeto que dependem deles são importados
+dentro das funções que os usam, na primeira chamada: a leitura dos argumentos, a ajuda
+(--help) e os erros de entrada não pagam o custo dessas importações.
 """
-import torch
-from PIL import Image
-from torchvision import transforms
-from model_crops import RedeCnnCulturasAgricolas
+import argparse
+import contextlib
+import csv
+import functools
+import glob
+import json
+import time
 import os
 import sys
 
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png')
+FORMATOS_SAIDA = ('jsonl', 'csv')
+
 
 def carregar_modelo(caminho_modelo='modelo_final_culturas.pth', num_classes=30, device='cpu'):
     """
@@ -26,8 +37,20 @@ def carregar_modelo(caminho_modelo='modelo_final_culturas.pth', num_classes=30,
         print("   Primeiro você precisa treinar o modelo executando: python main_crops.py")
         return None
     
-    modelo = RedeCnnCulturasAgricolas(num_classes=num_classes)
-    modelo.load_state_dict(torch.load(caminho_modelo, map_location=device))
+    import torch
+    from model_crops import RedeCnnCulturasAgricolas
+    
+    estado = torch.load(caminho_modelo, map_location=device)
+    try:
+        # Criado no dispositivo 'meta', o modelo não inicializa pesos aleatórios que
+        # seriam descartados: os tensores do arquivo são usados diretamente
+        with torch.device('meta'):
+            modelo = RedeCnnCulturasAgricolas(num_classes=num_classes)
+        modelo.load_state_dict(estado, assign=True)
+    except (AttributeError, TypeError):
+        # Versões do PyTorch sem torch.device como contexto ou sem assign
+        modelo = RedeCnnCulturasAgricolas(num_classes=num_classes)
+        modelo.load_state_dict(estado)
     modelo = modelo.to(device)
     modelo.eval()
     
@@ -59,18 +82,20 @@ def carregar_classes(caminho_classes='classes_culturas.txt'):
     return classes
 
 
-def preprocessar_imagem(caminho_imagem, tamanho=224, normalizar=True):
+@functools.lru_cache(maxsize=None)
+def criar_preprocessamento(tamanho=224, normalizar=True):
     """
-    Carrega e preprocessa uma imagem para classificação.
+    Cria (uma única vez por configuração) as transformações de preprocessar_imagem.
     
     Args:
-        caminho_imagem: Caminho para a imagem
-        tamanho: Tamanho para redimensionar (padrão: 224)
-        normalizar: Se True, aplica normalização estatística (deve ser igual ao treinamento)
+        tamanho: Tamanho para redimensionar
+        normalizar: Se True, inclui a normalização estatística
         
     Returns:
-        Tensor da imagem processada
+        Compose: Transformações de imagem PIL para tensor
     """
+    from torchvision import transforms
+    
     transformacoes = [
         transforms.Resize((tamanho, tamanho)),
         transforms.ToTensor()  # Converte para [0, 1]
@@ -85,7 +110,25 @@ def preprocessar_imagem(caminho_imagem, tamanho=224, normalizar=True):
             )
         )
     
-    transform = transforms.Compose(transformacoes)
+    return transforms.Compose(transformacoes)
+
+
+def preprocessar_imagem(caminho_imagem, tamanho=224, normalizar=True):
+    """
+    Carrega e preprocessa uma imagem para classificação.
+    
+    Args:
+        caminho_imagem: Caminho para a imagem ou objeto de arquivo (ex.: BytesIO com os
+                        bytes recebidos por servidor_inferencia.py)
+        tamanho: Tamanho para redimensionar (padrão: 224)
+        normalizar: Se True, aplica normalização estatística (deve ser igual ao treinamento)
+        
+    Returns:
+        Tensor da imagem processada
+    """
+    from PIL import Image
+    
+    transform = criar_preprocessamento(tamanho, normalizar)
     
     try:
         imagem = Image.open(caminho_imagem).convert('RGB')
@@ -97,7 +140,8 @@ def preprocessar_imagem(caminho_imagem, tamanho=224, normalizar=True):
 
 
 def classificar_imagem(caminho_imagem, caminho_modelo='modelo_final_culturas.pth', 
-                       top_k=5, device=None):
+                       top_k=5, device=None, channels_last=False, compilar=False,
+                       ajustar_threads_cpu=False):
     """
     Classifica uma imagem e retorna as classes mais prováveis.
     
@@ -106,10 +150,17 @@ def classificar_imagem(caminho_imagem, caminho_modelo='modelo_final_culturas.pth
         caminho_modelo: Caminho para o modelo treinado
         top_k: Número de top classes para mostrar
         device: Dispositivo ('cpu' ou 'cuda'), None para auto-detectar
+        channels_last: Se True, usa o formato de memória channels_last
+        compilar: Se True, compila o modelo com torch.compile (volta ao modo eager se falhar)
+        ajustar_threads_cpu: Se True, mede e aplica o número de threads mais rápido na CPU
+                             (a escolha fica em cache para as próximas execuções)
         
     Returns:
         Lista de tuplas (classe, probabilidade)
     """
+    import torch
+    from preparacao_modelo import preparar_modelo, converter_entrada
+    
     if device is None:
         device = 'cuda' if torch.cuda.is_available() else 'cpu'
     
@@ -129,6 +180,11 @@ def classificar_imagem(caminho_imagem, caminho_modelo='modelo_final_culturas.pth
     if modelo is None:
         return None
     
+    if ajustar_threads_cpu and device == 'cpu':
+        from ajuste_threads import ajustar_threads
+        ajustar_threads(modelo, (1, 3, 224, 224), treino=False, channels_last=channels_last)
+    
+    executar = preparar_modelo(modelo, channels_last=channels_last, compilar=compilar)
     print("✅ Modelo carregado com sucesso\n")
     
     # Preprocessar imagem
@@ -137,13 +193,13 @@ def classificar_imagem(caminho_imagem, caminho_modelo='modelo_final_culturas.pth
     if imagem_tensor is None:
         return None
     
-    imagem_tensor = imagem_tensor.to(device)
+    imagem_tensor = converter_entrada(imagem_tensor.to(device), channels_last)
     print("✅ Imagem processada\n")
     
     # Classificar
     print("Classificando...")
     with torch.no_grad():
-        outputs = modelo(imagem_tensor)
+        outputs = executar(imagem_tensor)
         probabilidades = torch.softmax(outputs, dim=1)
         prob, indices = torch.topk(probabilidades, top_k)
     
@@ -160,6 +216,200 @@ def classificar_imagem(caminho_imagem, caminho_modelo='modelo_final_culturas.pth
     return resultados
 
 
+def listar_imagens(entrada):
+    """
+    Lista as imagens de uma entrada do modo em lote.
+    
+    Args:
+        entrada: Pasta (percorrida recursivamente), padrão glob (ex.: 'fotos/*.jpg'),
+                 arquivo .txt com um caminho por linha ou o caminho de uma imagem
+        
+    Returns:
+        list: Caminhos das imagens, em ordem alfabética (na ordem do arquivo para listas)
+    """
+    if os.path.isdir(entrada):
+        caminhos = []
+        for raiz, _, arquivos in os.walk(entrada):
+            caminhos.extend(os.path.join(raiz, nome) for nome in arquivos
+                            if nome.lower().endswith(EXTENSOES_IMAGEM))
+        return sorted(caminhos)
+    
+    if glob.has_magic(entrada):
+        return sorted(c for c in glob.glob(entrada, recursive=True) if os.path.isfile(c))
+    
+    if entrada.lower().endswith('.txt'):
+        with open(entrada, 'r', encoding='utf-8') as f:
+            return [linha.strip() for linha in f if linha.strip()]
+    
+    return [entrada]
+
+
+def _lotes(resultados, tamanho):
+    """Agrupa os resultados do decodificador em listas de até tamanho elementos."""
+    lote = []
+    for resultado in resultados:
+        lote.append(resultado)
+        if len(lote) == tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class EscritorResultados:
+    """Grava os top-k de cada imagem em JSONL ou CSV à medida que os lotes terminam."""
+    
+    def __init__(self, arquivo, formato, top_k):
+        """
+        Args:
+            arquivo: Arquivo de texto aberto para escrita
+            formato: 'jsonl' (um objeto JSON por linha) ou 'csv'
+            top_k: Número de classes por imagem
+        """
+        self.arquivo = arquivo
+        self.formato = formato
+        self.top_k = top_k
+        self.csv = None
+        if formato == 'csv':
+            self.csv = csv.writer(arquivo)
+            colunas = ['imagem']
+            for i in range(1, top_k + 1):
+                colunas += [f'classe_{i}', f'probabilidade_{i}']
+            self.csv.writerow(colunas + ['erro'])
+    
+    def escrever(self, imagem, top=None, erro=None):
+        """
+        Grava o resultado de uma imagem.
+        
+        Args:
+            imagem: Caminho da imagem
+            top: Lista de tuplas (classe, probabilidade em %), ou None se houve erro
+            erro: Mensagem de erro da decodificação, ou None
+        """
+        top = top or []
+        if self.csv is not None:
+            linha = [imagem]
+            for classe, probabilidade in top:
+                linha += [classe, f"{probabilidade:.4f}"]
+            linha += [''] * (2 * (self.top_k - len(top)))
+            self.csv.writerow(linha + [erro or ''])
+            return
+        registro = {'imagem': imagem,
+                    'top': [{'classe': c, 'probabilidade': round(p, 4)} for c, p in top]}
+        if erro is not None:
+            registro['erro'] = erro
+        self.arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+
+def classificar_lote(entrada, caminho_modelo='modelo_final_culturas.pth', saida='-',
+                     formato=None, batch_size=64, num_workers=0, top_k=5, device=None,
+                     channels_last=False, compilar=False, ajustar_threads_cpu=False):
+    """
+    Classifica muitas imagens carregando o modelo e as classes uma única vez.
+    
+    As imagens são decodificadas por um pool de processos (Decodificador) enquanto o
+    modelo processa lotes de batch_size imagens; os top-k de cada imagem são gravados
+    assim que o lote termina, na mesma ordem das imagens de entrada.
+    
+    Args:
+        entrada: Pasta, padrão glob, arquivo .txt com caminhos ou caminho de uma imagem
+        caminho_modelo: Caminho para o modelo treinado
+        saida: Arquivo de resultados ('-' para a saída padrão)
+        formato: 'jsonl' ou 'csv' (None escolhe pela extensão de saida; padrão jsonl)
+        batch_size: Imagens por forward do modelo
+        num_workers: Processos de decodificação (0 ou 1 decodifica no processo atual)
+        top_k: Número de classes por imagem
+        device: Dispositivo ('cpu' ou 'cuda'), None para auto-detectar
+        channels_last: Se True, usa o formato de memória channels_last
+        compilar: Se True, compila o modelo com torch.compile (volta ao modo eager se falhar)
+        ajustar_threads_cpu: Se True, mede e aplica o número de threads mais rápido na CPU
+        
+    Returns:
+        dict: 'imagens' (classificadas), 'erros', 'tempo_s' e 'imagens_por_segundo',
+              ou None se o modelo não puder ser carregado
+    """
+    import torch
+    from data_loader_crops import criar_transformacoes, normalizar_lote
+    from decodificacao import Decodificador, descrever_origem
+    from preparacao_modelo import preparar_modelo, converter_entrada
+    
+    if device is None:
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    if formato is None:
+        formato = 'csv' if saida.lower().endswith('.csv') else 'jsonl'
+    if formato not in FORMATOS_SAIDA:
+        raise ValueError(f"formato deve ser um de {FORMATOS_SAIDA}, recebido: {formato}")
+    
+    # Com os resultados na saída padrão, as mensagens vão para stderr
+    mensagens = sys.stderr if saida == '-' else sys.stdout
+    
+    caminhos = listar_imagens(entrada)
+    print(f"Imagens encontradas: {len(caminhos)}", file=mensagens)
+    
+    with contextlib.redirect_stdout(mensagens):
+        classes = carregar_classes()
+        modelo = carregar_modelo(caminho_modelo, num_classes=len(classes), device=device)
+        if modelo is None:
+            return None
+        
+        if ajustar_threads_cpu and device == 'cpu':
+            from ajuste_threads import ajustar_threads
+            ajustar_threads(modelo, (batch_size, 3, 224, 224), treino=False, channels_last=channels_last)
+        executar = preparar_modelo(modelo, channels_last=channels_last, compilar=compilar)
+    top_k = min(top_k, len(classes))
+    
+    # uint8 reduz a cópia entre processos; a normalização é feita no lote, no dispositivo
+    transform = criar_transformacoes(224, armazenamento='uint8')
+    tamanho_chunk = max(1, batch_size // max(num_workers, 1))
+    
+    classificadas = 0
+    erros = 0
+    inicio = time.time()
+    arquivo = sys.stdout if saida == '-' else open(saida, 'w', newline='', encoding='utf-8')
+    try:
+        escritor = EscritorResultados(arquivo, formato, top_k)
+        with Decodificador(transform, num_workers=num_workers, tamanho_chunk=tamanho_chunk) as decodificador:
+            for lote in _lotes(decodificador.decodificar(caminhos), batch_size):
+                validos = [(origem, tensor) for origem, tensor, _ in lote if tensor is not None]
+                top_por_imagem = {}
+                if validos:
+                    entradas = torch.stack([tensor for _, tensor in validos]).to(device)
+                    entradas = converter_entrada(normalizar_lote(entradas), channels_last)
+                    with torch.no_grad():
+                        probabilidades = torch.softmax(executar(entradas), dim=1)
+                        prob, indices = torch.topk(probabilidades, top_k)
+                    prob = (prob * 100).cpu().tolist()
+                    indices = indices.cpu().tolist()
+                    for (origem, _), p, idx in zip(validos, prob, indices):
+                        top_por_imagem[origem] = [(classes[i], pi) for i, pi in zip(idx, p)]
+                
+                for origem, tensor, erro in lote:
+                    if tensor is None:
+                        erros += 1
+                        escritor.escrever(descrever_origem(origem), erro=erro)
+                    else:
+                        classificadas += 1
+                        escritor.escrever(descrever_origem(origem), top_por_imagem[origem])
+                arquivo.flush()
+    finally:
+        if arquivo is not sys.stdout:
+            arquivo.close()
+    
+    tempo = time.time() - inicio
+    imagens_por_segundo = classificadas / tempo if tempo > 0 else 0.0
+    print(f"✓ {classificadas} imagens classificadas em {tempo:.2f}s "
+          f"({imagens_por_segundo:.1f} imagens/s)", file=mensagens)
+    if erros:
+        print(f"⚠️  Aviso: {erros} imagens não puderam ser decodificadas", file=mensagens)
+    
+    return {
+        'imagens': classificadas,
+        'erros': erros,
+        'tempo_s': tempo,
+        'imagens_por_segundo': imagens_por_segundo
+    }
+
+
 def imprimir_resultados(resultados):
     """Imprime os resultados da classificação de forma formatada."""
     if resultados is None:
@@ -193,23 +443,58 @@ def imprimir_resultados(resultados):
 
 def main():
     """Função principal."""
-    if len(sys.argv) < 2:
-        print("Uso: python classificar_imagem.py <caminho_da_imagem> [caminho_do_modelo]")
-        print("\nExemplos:")
-        print("  python classificar_imagem.py imagem.jpg")
-        print("  python classificar_imagem.py imagem.jpg modelo_final_culturas.pth")
-        print("\nNota: Você precisa treinar o modelo primeiro executando:")
-        print("  python main_crops.py")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description='Classifica imagens usando o modelo de culturas treinado.',
+        epilog='Exemplos:\n'
+               '  python classificar_imagem.py imagem.jpg\n'
+               '  python classificar_imagem.py imagem.jpg modelo_final_culturas.pth\n'
+               '  python classificar_imagem.py fotos/ --saida resultados.jsonl --workers 4\n'
+               '  python classificar_imagem.py "fotos/**/*.jpg" --saida resultados.csv\n'
+               '  python classificar_imagem.py lista.txt --batch-size 128\n\n'
+               'Pastas, padrões glob, listas .txt ou --saida ativam o modo em lote.\n\n'
+               'Nota: Você precisa treinar o modelo primeiro executando:\n'
+               '  python main_crops.py',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('imagem', help='Caminho da imagem, pasta, padrão glob ou lista .txt')
+    parser.add_argument('modelo', nargs='?', default='modelo_final_culturas.pth',
+                        help='Caminho do modelo (padrão: modelo_final_culturas.pth)')
+    parser.add_argument('--channels-last', action='store_true',
+                        help='Usa o formato de memória channels_last')
+    parser.add_argument('--compilar', action='store_true',
+                        help='Compila o modelo com torch.compile')
+    parser.add_argument('--ajustar-threads', action='store_true',
+                        help='Mede e aplica o número de threads de cálculo mais rápido na CPU')
+    parser.add_argument('--saida', default=None,
+                        help="Arquivo de resultados do modo em lote ('-' para a saída padrão)")
+    parser.add_argument('--formato', choices=FORMATOS_SAIDA, default=None,
+                        help='Formato dos resultados (padrão: pela extensão de --saida, ou jsonl)')
+    parser.add_argument('--batch-size', type=int, default=64,
+                        help='Imagens por forward no modo em lote (padrão: 64)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Processos de decodificação no modo em lote (padrão: 0)')
+    parser.add_argument('--top-k', type=int, default=5, help='Classes por imagem (padrão: 5)')
+    args = parser.parse_args()
     
-    caminho_imagem = sys.argv[1]
-    caminho_modelo = sys.argv[2] if len(sys.argv) > 2 else 'modelo_final_culturas.pth'
+    lote = (args.saida is not None or os.path.isdir(args.imagem) or glob.has_magic(args.imagem)
+            or args.imagem.lower().endswith('.txt'))
+    if lote:
+        resumo = classificar_lote(args.imagem, args.modelo, saida=args.saida or '-',
+                                  formato=args.formato, batch_size=args.batch_size,
+                                  num_workers=args.workers, top_k=args.top_k,
+                                  channels_last=args.channels_last, compilar=args.compilar,
+                                  ajustar_threads_cpu=args.ajustar_threads)
+        if resumo is None:
+            sys.exit(1)
+        return
     
-    if not os.path.exists(caminho_imagem):
-        print(f"❌ ERRO: Imagem não encontrada: {caminho_imagem}")
+    if not os.path.exists(args.imagem):
+        print(f"❌ ERRO: Imagem não encontrada: {args.imagem}")
         sys.exit(1)
     
-    resultados = classificar_imagem(caminho_imagem, caminho_modelo)
+    resultados = classificar_imagem(args.imagem, args.modelo, top_k=args.top_k,
+                                    channels_last=args.channels_last, compilar=args.compilar,
+                                    ajustar_threads_cpu=args.ajustar_threads)
     imprimir_resultados(resultados)
 
 
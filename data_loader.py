@@ -1,13 +1,105 @@
 """
 Módulo para carregar e processar imagens dos arquivos ZIP.
 """
+import random
 import zipfile
 from io import BytesIO
-from PIL import Image
 import torch
 from torchvision import transforms
-from torch.utils.data import TensorDataset
+from torch.utils.data import TensorDataset, IterableDataset, get_worker_info
 import numpy as np
+from decodificacao import Decodificador, abrir_imagem
+
+
+class DatasetStreamingZip(IterableDataset):
+    """
+    Dataset que lê as imagens diretamente dos arquivos ZIP durante a iteração.
+    
+    Apenas a lista de nomes dos arquivos fica em memória. A cada época a lista é
+    embaralhada, dividida entre os workers do DataLoader e as imagens decodificadas
+    passam por um buffer de embaralhamento de tamanho limitado, de forma que o uso
+    de memória não depende do tamanho dos arquivos ZIP.
+    """
+    
+    def __init__(self, zip_path_passaros, zip_path_nao_passaros, max_imagens_por_classe,
+                 transform=None, tamanho_buffer=1000, decodificacao_reduzida=False):
+        """
+        Args:
+            zip_path_passaros: Caminho para o ZIP com imagens de pássaros
+            zip_path_nao_passaros: Caminho para o ZIP com imagens de não-pássaros
+            max_imagens_por_classe: Número máximo de imagens por classe
+            transform: Transformações a serem aplicadas (padrão: criar_transformacoes())
+            tamanho_buffer: Número de imagens mantidas no buffer de embaralhamento
+            decodificacao_reduzida: Se True, JPEGs são decodificados em escala reduzida (DCT)
+        """
+        self.transform = transform if transform is not None else criar_transformacoes()
+        self.tamanho_buffer = max(1, tamanho_buffer)
+        self.tamanho_reduzido = (TAMANHO_IMAGEM, TAMANHO_IMAGEM) if decodificacao_reduzida else None
+        self.membros = (
+            self._listar_membros(zip_path_passaros, 1, max_imagens_por_classe) +
+            self._listar_membros(zip_path_nao_passaros, 0, max_imagens_por_classe)
+        )
+    
+    @staticmethod
+    def _listar_membros(zip_path, label, max_imagens):
+        """Lista os nomes das imagens do ZIP sem descompactá-las."""
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            nomes = [
+                nome_arquivo for nome_arquivo in zip_ref.namelist()
+                if nome_arquivo.lower().endswith(('.png', '.jpg', '.jpeg'))
+            ]
+        return [(zip_path, nome_arquivo, label) for nome_arquivo in nomes[:max_imagens]]
+    
+    def __len__(self):
+        return len(self.membros)
+    
+    def __iter__(self):
+        info = get_worker_info()
+        if info is None:
+            # Processo único: a semente avança junto com o gerador global a cada época
+            semente = int(torch.randint(0, 2**31 - 1, (1,)).item())
+            id_worker, num_workers = 0, 1
+        else:
+            # Todos os workers usam a mesma semente base para obter a mesma permutação
+            semente = info.seed - info.id
+            id_worker, num_workers = info.id, info.num_workers
+        
+        gerador = random.Random(semente + id_worker)
+        ordem = np.random.RandomState(semente % 2**32).permutation(len(self.membros))
+        meus_membros = [self.membros[i] for i in ordem[id_worker::num_workers]]
+        
+        buffer = []
+        zips_abertos = {}
+        try:
+            for zip_path, nome_arquivo, label in meus_membros:
+                zip_ref = zips_abertos.get(zip_path)
+                if zip_ref is None:
+                    zip_ref = zipfile.ZipFile(zip_path, 'r')
+                    zips_abertos[zip_path] = zip_ref
+                
+                try:
+                    imagem = abrir_imagem(BytesIO(zip_ref.read(nome_arquivo)), self.tamanho_reduzido)
+                    amostra = (self.transform(imagem), torch.tensor([label], dtype=torch.float32))
+                except Exception as e:
+                    print(f"Erro ao carregar {nome_arquivo} de {zip_path}: {e}")
+                    continue
+                
+                # Buffer de embaralhamento: com o buffer cheio, troca um elemento aleatório
+                if len(buffer) < self.tamanho_buffer:
+                    buffer.append(amostra)
+                    continue
+                indice = gerador.randrange(len(buffer))
+                yield buffer[indice]
+                buffer[indice] = amostra
+            
+            gerador.shuffle(buffer)
+            yield from buffer
+        finally:
+            for zip_ref in zips_abertos.values():
+                zip_ref.close()
+
+
+TAMANHO_IMAGEM = 32
 
 
 def criar_transformacoes():
@@ -18,12 +110,13 @@ def criar_transformacoes():
         Compose: Objeto com as transformações aplicadas
     """
     return transforms.Compose([
-        transforms.Resize((32, 32)),
+        transforms.Resize((TAMANHO_IMAGEM, TAMANHO_IMAGEM)),
         transforms.ToTensor(),
     ])
 
 
-def carregar_imagens(zip_path, label, max_imagens, transform, tensores_entrada, tensores_saida):
+def carregar_imagens(zip_path, label, max_imagens, transform, tensores_entrada, tensores_saida,
+                     decodificador=None):
     """
     Carrega imagens de um arquivo ZIP e as converte para tensores.
     
@@ -34,24 +127,33 @@ def carregar_imagens(zip_path, label, max_imagens, transform, tensores_entrada,
         transform: Transformações a serem aplicadas nas imagens
         tensores_entrada: Lista para armazenar os tensores de entrada
         tensores_saida: Lista para armazenar os rótulos
+        decodificador: Decodificador opcional (ex.: com pool de processos).
+                       Se None, as imagens são decodificadas sequencialmente.
     """
-    contador = 0
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        for nome_arquivo in zip_ref.namelist():
-            if nome_arquivo.lower().endswith(('.png', '.jpg', '.jpeg')):
-                with zip_ref.open(nome_arquivo) as arquivo:
-                    imagem = Image.open(BytesIO(arquivo.read())).convert('RGB')
-                    tensor = transform(imagem)
-                    tensores_entrada.append(tensor)
-                    tensores_saida.append([label])
-                contador += 1
-                if contador % 1000 == 0:
-                    print(f"Carregadas {contador} imagens de {zip_path}")
-                if contador >= max_imagens:
-                    return
+        nomes_imagens = [
+            nome_arquivo for nome_arquivo in zip_ref.namelist()
+            if nome_arquivo.lower().endswith(('.png', '.jpg', '.jpeg'))
+        ]
+    
+    if decodificador is None:
+        decodificador = Decodificador(transform)
+    
+    origens = [(zip_path, nome_arquivo) for nome_arquivo in nomes_imagens[:max_imagens]]
+    contador = 0
+    for (_, nome_arquivo), tensor, erro in decodificador.decodificar(origens):
+        if erro is not None:
+            print(f"Erro ao carregar {nome_arquivo} de {zip_path}: {erro}")
+            continue
+        tensores_entrada.append(tensor)
+        tensores_saida.append([label])
+        contador += 1
+        if contador % 1000 == 0:
+            print(f"Carregadas {contador} imagens de {zip_path}")
 
 
-def preparar_dataset(zip_path_passaros, zip_path_nao_passaros, max_imagens_por_classe, device=None):
+def preparar_dataset(zip_path_passaros, zip_path_nao_passaros, max_imagens_por_classe, device=None,
+                     num_workers=0, streaming=False, tamanho_buffer=1000, decodificacao_reduzida=False):
     """
     Prepara o dataset completo a partir dos arquivos ZIP.
     
@@ -61,21 +163,38 @@ def preparar_dataset(zip_path_passaros, zip_path_nao_passaros, max_imagens_por_c
         max_imagens_por_classe: Número máximo de imagens por classe
         device: Dispositivo (obsoleto, mantido para compatibilidade). 
                 Os dados são mantidos na CPU e movidos para GPU durante o treinamento.
+        num_workers: Processos usados para decodificar as imagens (0 para sequencial)
+        streaming: Se True, retorna um DatasetStreamingZip que lê as imagens dos ZIPs
+                   durante a iteração, sem carregar o dataset inteiro em memória
+        tamanho_buffer: Tamanho do buffer de embaralhamento no modo streaming
+        decodificacao_reduzida: Se True, JPEGs são decodificados diretamente em escala
+                                reduzida (DCT) antes do redimensionamento final
         
     Returns:
-        TensorDataset: Dataset pronto para treinamento (dados na CPU)
+        TensorDataset (dados na CPU) ou DatasetStreamingZip, se streaming=True
     """
     transform = criar_transformacoes()
+    
+    if streaming:
+        dataset = DatasetStreamingZip(zip_path_passaros, zip_path_nao_passaros,
+                                      max_imagens_por_classe, transform, tamanho_buffer,
+                                      decodificacao_reduzida)
+        print(f'Dataset em modo streaming: {len(dataset)} imagens nos arquivos ZIP')
+        print(f'Buffer de embaralhamento: {dataset.tamanho_buffer} imagens')
+        return dataset
+    
     tensores_entrada = []
     tensores_saida = []
     
-    print("Carregando imagens de pássaros...")
-    carregar_imagens(zip_path_passaros, 1, max_imagens_por_classe, 
-                     transform, tensores_entrada, tensores_saida)
-    
-    print("Carregando imagens de não-pássaros...")
-    carregar_imagens(zip_path_nao_passaros, 0, max_imagens_por_classe, 
-                     transform, tensores_entrada, tensores_saida)
+    tamanho_reduzido = (TAMANHO_IMAGEM, TAMANHO_IMAGEM) if decodificacao_reduzida else None
+    with Decodificador(transform, num_workers, tamanho_reduzido=tamanho_reduzido) as decodificador:
+        print("Carregando imagens de pássaros...")
+        carregar_imagens(zip_path_passaros, 1, max_imagens_por_classe, 
+                         transform, tensores_entrada, tensores_saida, decodificador)
+        
+        print("Carregando imagens de não-pássaros...")
+        carregar_imagens(zip_path_nao_passaros, 0, max_imagens_por_classe, 
+                         transform, tensores_entrada, tensores_saida, decodificador)
     
     print(f'Total de imagens carregadas: {len(tensores_entrada)}')
     
@@ -2,85 +2,169 @@
 Módulo para carregar e processar imagens do dataset Agricultural-crops.
 """
 import os
-from PIL import Image
+import threading
+from collections import OrderedDict
 import torch
 from torchvision import transforms
 from torch.utils.data import TensorDataset, Dataset
 import numpy as np
 from pathlib import Path
+from cache_tensores import CacheTensores, ManifestoConteudo
+from decodificacao import Decodificador, abrir_imagem, verificar_imagem
+
+
+# Valores padrão do ImageNet (comum em modelos de visão computacional)
+MEDIA_NORMALIZACAO = [0.485, 0.456, 0.406]   # Média para cada canal RGB
+DESVIO_NORMALIZACAO = [0.229, 0.224, 0.225]  # Desvio padrão para cada canal RGB
+
+ARMAZENAMENTOS = ('float32', 'uint8')
+MODOS = ('eager', 'lazy')
 
 
 class CropDataset(Dataset):
     """
-    Dataset personalizado para carregar imagens de culturas agrícolas.
+    Dataset preguiçoso (lazy) para imagens de culturas agrícolas.
+    
+    Guarda apenas os caminhos dos arquivos e os rótulos; cada imagem é decodificada
+    em __getitem__ e mantida em um cache LRU limitado por tamanho em bytes. Assim
+    datasets maiores que a memória podem ser usados com consumo de memória limitado.
+    
+    Cada worker do DataLoader recebe uma cópia do dataset com o próprio cache
+    (vazio ao ser criado); o cache nunca é compartilhado entre processos e o acesso
+    dentro de um processo é protegido por um lock.
     """
     
-    def __init__(self, images, labels, transform=None):
+    def __init__(self, caminhos, labels, transform, tamanho_cache_mb=512, tamanho_reduzido=None):
         """
         Args:
-            images: Lista de tensores de imagens
+            caminhos: Lista de caminhos dos arquivos de imagem
             labels: Lista de rótulos (índices das classes)
             transform: Transformações a serem aplicadas
+            tamanho_cache_mb: Limite do cache de imagens decodificadas em MB (0 desativa)
+            tamanho_reduzido: Tupla (largura, altura) para decodificação JPEG reduzida ou None
         """
-        self.images = images
-        self.labels = labels
+        # Caminhos absolutos: o diretório de trabalho pode mudar depois da criação
+        self.caminhos = [os.path.abspath(c) for c in caminhos]
+        self.labels = torch.tensor(labels, dtype=torch.long)
         self.transform = transform
+        self.limite_cache = int(tamanho_cache_mb * 1024 * 1024)
+        self.tamanho_reduzido = tamanho_reduzido
+        self._iniciar_cache()
+    
+    def _iniciar_cache(self):
+        self._cache = OrderedDict()
+        self._bytes_cache = 0
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        # Não copiar o cache (nem o lock) para os processos dos workers
+        estado = self.__dict__.copy()
+        del estado['_cache'], estado['_bytes_cache'], estado['_lock']
+        return estado
+    
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._iniciar_cache()
     
     def __len__(self):
-        return len(self.images)
+        return len(self.caminhos)
     
     def __getitem__(self, idx):
-        image = self.images[idx]
         label = self.labels[idx]
         
-        if self.transform:
-            image = self.transform(image)
+        with self._lock:
+            image = self._cache.get(idx)
+            if image is not None:
+                self._cache.move_to_end(idx)
+                return image, label
+        
+        caminho = self.caminhos[idx]
+        try:
+            image = self.transform(abrir_imagem(caminho, self.tamanho_reduzido))
+        except Exception as e:
+            raise RuntimeError(f"Erro ao carregar {caminho}: {e}") from e
+        
+        tamanho = image.element_size() * image.nelement()
+        if tamanho <= self.limite_cache:
+            with self._lock:
+                if idx not in self._cache:
+                    self._cache[idx] = image
+                    self._bytes_cache += tamanho
+                # Remover as imagens usadas há mais tempo até caber no limite
+                while self._bytes_cache > self.limite_cache:
+                    _, antiga = self._cache.popitem(last=False)
+                    self._bytes_cache -= antiga.element_size() * antiga.nelement()
         
         return image, label
 
 
-def criar_transformacoes(tamanho_imagem=224, normalizar=True):
+def criar_transformacoes(tamanho_imagem=224, normalizar=True, armazenamento='float32'):
     """
     Cria as transformações para padronizar e converter imagens para tensores.
     
     Args:
         tamanho_imagem: Tamanho para redimensionar as imagens (padrão: 224x224)
         normalizar: Se True, aplica normalização estatística (padrão: True)
+        armazenamento: 'float32' (padrão) gera tensores prontos para o modelo;
+                       'uint8' mantém os pixels em [0, 255] e deixa a conversão e a
+                       normalização para normalizar_lote, aplicada a cada lote
         
     Returns:
         Compose: Objeto com as transformações aplicadas
     """
+    if armazenamento == 'uint8':
+        return transforms.Compose([
+            transforms.Resize((tamanho_imagem, tamanho_imagem)),
+            transforms.PILToTensor()  # Mantém uint8 em [0, 255]
+        ])
+    
     transformacoes = [
         transforms.Resize((tamanho_imagem, tamanho_imagem)),
         transforms.ToTensor()  # Converte para [0, 1]
     ]
     
     # Normalização estatística: normaliza para média ~0 e desvio padrão ~1
-    # Valores padrão do ImageNet (comum em modelos de visão computacional)
     if normalizar:
         transformacoes.append(
-            transforms.Normalize(
-                mean=[0.485, 0.456, 0.406],  # Média para cada canal RGB
-                std=[0.229, 0.224, 0.225]     # Desvio padrão para cada canal RGB
-            )
+            transforms.Normalize(mean=MEDIA_NORMALIZACAO, std=DESVIO_NORMALIZACAO)
         )
     
     return transforms.Compose(transformacoes)
 
 
-def carregar_imagens_classe(caminho_classe, transform, max_imagens=None):
+def normalizar_lote(inputs):
     """
-    Carrega todas as imagens de uma classe específica.
+    Converte um lote armazenado em uint8 para float e aplica a normalização.
+    
+    Faz as mesmas operações de ToTensor + Normalize, então o resultado é idêntico ao
+    do armazenamento em float32. Lotes que já estão em ponto flutuante são
+    devolvidos sem alteração.
+    
+    Args:
+        inputs: Tensor com shape [batch_size, 3, altura, largura]
+        
+    Returns:
+        Tensor float32 normalizado
+    """
+    if inputs.dtype != torch.uint8:
+        return inputs
+    
+    media = torch.tensor(MEDIA_NORMALIZACAO, device=inputs.device).view(1, -1, 1, 1)
+    desvio = torch.tensor(DESVIO_NORMALIZACAO, device=inputs.device).view(1, -1, 1, 1)
+    return inputs.float().div_(255).sub_(media).div_(desvio)
+
+
+def listar_arquivos_classe(caminho_classe, max_imagens=None):
+    """
+    Lista os arquivos de imagem de uma classe sem decodificá-los.
     
     Args:
         caminho_classe: Caminho para a pasta da classe
-        transform: Transformações a serem aplicadas
-        max_imagens: Número máximo de imagens a carregar (None para todas)
+        max_imagens: Número máximo de arquivos (None para todos)
         
     Returns:
-        Lista de tensores de imagens
+        Lista de caminhos dos arquivos de imagem
     """
-    imagens = []
     extensoes_permitidas = ('.jpg', '.jpeg', '.png', '.JPG', '.JPEG', '.PNG')
     
     arquivos_imagem = [
@@ -91,20 +175,163 @@ def carregar_imagens_classe(caminho_classe, transform, max_imagens=None):
     if max_imagens:
         arquivos_imagem = arquivos_imagem[:max_imagens]
     
-    for nome_arquivo in arquivos_imagem:
-        caminho_completo = os.path.join(caminho_classe, nome_arquivo)
-        try:
-            imagem = Image.open(caminho_completo).convert('RGB')
-            tensor = transform(imagem)
-            imagens.append(tensor)
-        except Exception as e:
-            print(f"Erro ao carregar {caminho_completo}: {e}")
+    return [os.path.join(caminho_classe, nome_arquivo) for nome_arquivo in arquivos_imagem]
+
+
+def carregar_arquivos(caminhos, transform, cache=None, decodificador=None):
+    """
+    Carrega uma lista de arquivos de imagem, reaproveitando o cache quando possível.
+    
+    Args:
+        caminhos: Lista de caminhos dos arquivos de imagem
+        transform: Transformações a serem aplicadas
+        cache: CacheTensores opcional com imagens já pré-processadas
+        decodificador: Decodificador opcional (ex.: com pool de processos).
+                       Se None, as imagens são decodificadas sequencialmente.
+        
+    Returns:
+        Lista de tensores na mesma ordem dos caminhos (None para arquivos com erro)
+    """
+    # Reaproveitar o que já está no cache e decodificar apenas o restante
+    tensores = [None] * len(caminhos)
+    pendentes = []
+    for i, caminho_completo in enumerate(caminhos):
+        if cache is not None:
+            tensores[i] = cache.obter(caminho_completo)
+        if tensores[i] is None:
+            pendentes.append(i)
+    
+    if decodificador is None:
+        decodificador = Decodificador(transform)
+    
+    origens = [caminhos[i] for i in pendentes]
+    for i, (caminho_completo, tensor, erro) in zip(pendentes, decodificador.decodificar(origens)):
+        if erro is not None:
+            print(f"Erro ao carregar {caminho_completo}: {erro}")
             continue
+        tensores[i] = tensor
+        if cache is not None:
+            cache.guardar(caminho_completo, tensor)
     
+    return tensores
+
+
+def carregar_imagens_classe(caminho_classe, transform, max_imagens=None, cache=None,
+                            decodificador=None):
+    """
+    Carrega todas as imagens de uma classe específica.
+    
+    Args:
+        caminho_classe: Caminho para a pasta da classe
+        transform: Transformações a serem aplicadas
+        max_imagens: Número máximo de imagens a carregar (None para todas)
+        cache: CacheTensores opcional com imagens já pré-processadas
+        decodificador: Decodificador opcional (ex.: com pool de processos).
+                       Se None, as imagens são decodificadas sequencialmente.
+        
+    Returns:
+        Lista de tensores de imagens
+    """
+    caminhos = listar_arquivos_classe(caminho_classe, max_imagens)
+    tensores = carregar_arquivos(caminhos, transform, cache, decodificador)
+    return [tensor for tensor in tensores if tensor is not None]
+
+
+def selecionar_imagens(arquivos, quantidade, transform, cache=None, decodificador=None):
+    """
+    Decodifica os primeiros arquivos da lista até obter a quantidade pedida.
+    
+    Arquivos que falham na decodificação são substituídos pelos seguintes da lista,
+    de forma que apenas as imagens realmente usadas sejam decodificadas.
+    
+    Args:
+        arquivos: Lista de caminhos, já embaralhada
+        quantidade: Número de imagens desejado
+        transform: Transformações a serem aplicadas
+        cache: CacheTensores opcional com imagens já pré-processadas
+        decodificador: Decodificador opcional (ex.: com pool de processos)
+        
+    Returns:
+        Lista com até `quantidade` tensores de imagens
+    """
+    imagens = []
+    posicao = 0
+    while len(imagens) < quantidade and posicao < len(arquivos):
+        lote = arquivos[posicao:posicao + quantidade - len(imagens)]
+        posicao += len(lote)
+        tensores = carregar_arquivos(lote, transform, cache, decodificador)
+        imagens.extend(tensor for tensor in tensores if tensor is not None)
     return imagens
 
 
-def preparar_datasets(caminho_dataset, tamanho_imagem=224, imagens_treino=20, imagens_validacao=12):
+def selecionar_caminhos(arquivos, quantidade):
+    """
+    Escolhe os primeiros arquivos válidos da lista sem decodificar as imagens.
+    
+    Equivalente a selecionar_imagens para o modo 'lazy': arquivos inválidos são
+    substituídos pelos seguintes da lista, mas a validação é feita com
+    verificar_imagem e nenhum pixel fica na memória.
+    
+    Args:
+        arquivos: Lista de caminhos, já embaralhada
+        quantidade: Número de imagens desejado
+        
+    Returns:
+        Lista com até `quantidade` caminhos
+    """
+    caminhos = []
+    for caminho in arquivos:
+        if len(caminhos) >= quantidade:
+            break
+        erro = verificar_imagem(caminho)
+        if erro is not None:
+            print(f"Erro ao carregar {caminho}: {erro}")
+            continue
+        caminhos.append(caminho)
+    return caminhos
+
+
+def remover_duplicatas(arquivos_por_classe, classes, manifesto):
+    """
+    Remove arquivos com conteúdo idêntico, mantendo apenas a primeira ocorrência.
+    
+    Args:
+        arquivos_por_classe: Lista com a lista de arquivos de cada classe
+        classes: Lista com nomes das classes (mesma ordem)
+        manifesto: ManifestoConteudo com o hash de cada arquivo
+        
+    Returns:
+        Lista de arquivos de cada classe, sem duplicatas
+    """
+    primeiros = {}  # hash -> (classe, caminho) da primeira ocorrência
+    duplicatas = []
+    resultado = []
+    
+    for nome_classe, arquivos in zip(classes, arquivos_por_classe):
+        unicos = []
+        for caminho in arquivos:
+            conteudo = manifesto.hash(caminho)
+            if conteudo in primeiros:
+                duplicatas.append((nome_classe, caminho, primeiros[conteudo]))
+                continue
+            primeiros[conteudo] = (nome_classe, caminho)
+            unicos.append(caminho)
+        resultado.append(unicos)
+    
+    if duplicatas:
+        entre_classes = [d for d in duplicatas if d[0] != d[2][0]]
+        print(f"⚠️  {len(duplicatas)} imagens duplicadas ignoradas "
+              f"({len(entre_classes)} entre classes diferentes)")
+        for _, caminho, (_, original) in (entre_classes or duplicatas)[:5]:
+            print(f"   {caminho} = {original}")
+    
+    return resultado
+
+
+def preparar_datasets(caminho_dataset, tamanho_imagem=224, imagens_treino=20, imagens_validacao=12,
+                      normalizar=True, diretorio_cache=None, num_workers=0,
+                      decodificacao_reduzida=False, armazenamento='float32', modo='eager',
+                      tamanho_cache_mb=512):
     """
     Prepara os datasets de treino e validação a partir do diretório de culturas.
     
@@ -113,11 +340,32 @@ def preparar_datasets(caminho_dataset, tamanho_imagem=224, imagens_treino=20, im
         tamanho_imagem: Tamanho para redimensionar as imagens
         imagens_treino: Número de imagens por classe para treino
         imagens_validacao: Número de imagens por classe para validação
+        normalizar: Se True, aplica normalização estatística (padrão: True)
+        diretorio_cache: Pasta do cache de tensores e do manifesto de hashes dos arquivos
+                         (None desativa o cache e a remoção de imagens duplicadas)
+        num_workers: Processos usados para decodificar as imagens (0 para sequencial)
+        decodificacao_reduzida: Se True, JPEGs são decodificados diretamente em escala
+                                reduzida (DCT) antes do redimensionamento final
+        armazenamento: 'float32' guarda as imagens já normalizadas; 'uint8' guarda os
+                       pixels em 1 byte (4x menos memória) e a normalização é feita a
+                       cada lote com normalizar_lote no treino e na avaliação
+        modo: 'eager' (padrão) decodifica tudo antes do treino em um TensorDataset;
+              'lazy' cria CropDatasets que decodificam as imagens sob demanda
+        tamanho_cache_mb: Limite do cache LRU de cada CropDataset no modo 'lazy'
         
     Returns:
         tuple: (dataset_treino, dataset_validacao, lista_classes)
     """
-    transform = criar_transformacoes(tamanho_imagem)
+    if armazenamento not in ARMAZENAMENTOS:
+        raise ValueError(f"armazenamento deve ser um de {ARMAZENAMENTOS}, recebido: {armazenamento}")
+    if modo not in MODOS:
+        raise ValueError(f"modo deve ser um de {MODOS}, recebido: {modo}")
+    if armazenamento == 'uint8' and not normalizar:
+        raise ValueError("armazenamento='uint8' sempre normaliza por lote; use normalizar=True")
+    
+    transform = criar_transformacoes(tamanho_imagem, normalizar, armazenamento)
+    
+    tamanho_reduzido = (tamanho_imagem, tamanho_imagem) if decodificacao_reduzida else None
     
     # Obter todas as classes (pastas)
     caminho_base = Path(caminho_dataset)
@@ -126,46 +374,85 @@ def preparar_datasets(caminho_dataset, tamanho_imagem=224, imagens_treino=20, im
     print(f"Encontradas {len(classes)} classes de culturas")
     print(f"Classes: {', '.join(classes[:5])}... (mostrando primeiras 5)")
     
+    # Montar a lista de arquivos de cada classe antes de decodificar qualquer imagem
+    arquivos_por_classe = [listar_arquivos_classe(caminho_base / nome_classe) for nome_classe in classes]
+    
+    manifesto = None
+    if diretorio_cache:
+        manifesto = ManifestoConteudo(diretorio_cache)
+        contagem = manifesto.atualizar([c for arquivos in arquivos_por_classe for c in arquivos])
+        print(f"Manifesto: {contagem['novos']} arquivos novos, {contagem['alterados']} alterados, "
+              f"{contagem['removidos']} removidos, {contagem['inalterados']} inalterados")
+        arquivos_por_classe = remover_duplicatas(arquivos_por_classe, classes, manifesto)
+        manifesto.salvar()
+    
+    # No modo lazy nada é decodificado aqui, então o cache de tensores não é usado
+    cache = None
+    if diretorio_cache and modo == 'eager':
+        cache = CacheTensores(diretorio_cache, tamanho_imagem, normalizar, decodificacao_reduzida,
+                              armazenamento, manifesto)
+    
     imagens_treino_lista = []
     labels_treino_lista = []
     imagens_validacao_lista = []
     labels_validacao_lista = []
     
-    for idx_classe, nome_classe in enumerate(classes):
-        caminho_classe = caminho_base / nome_classe
-        
-        # Carregar todas as imagens da classe
-        todas_imagens = carregar_imagens_classe(caminho_classe, transform, max_imagens=None)
-        
-        total_imagens = len(todas_imagens)
-        print(f"Classe '{nome_classe}': {total_imagens} imagens encontradas")
-        
-        if total_imagens == 0:
-            print(f"  ⚠️  Aviso: Nenhuma imagem encontrada em {nome_classe}")
-            continue
-        
-        # Embaralhar as imagens
-        indices = np.random.permutation(total_imagens)
-        imagens_embaralhadas = [todas_imagens[i] for i in indices]
-        
-        # Dividir em treino e validação
-        num_treino = min(imagens_treino, total_imagens)
-        num_validacao = min(imagens_validacao, total_imagens - num_treino)
-        
-        # Treino
-        imagens_treino_lista.extend(imagens_embaralhadas[:num_treino])
-        labels_treino_lista.extend([idx_classe] * num_treino)
-        
-        # Validação
-        if num_validacao > 0:
-            imagens_validacao_lista.extend(imagens_embaralhadas[num_treino:num_treino + num_validacao])
-            labels_validacao_lista.extend([idx_classe] * num_validacao)
-        
-        print(f"  → Treino: {num_treino}, Validação: {num_validacao}")
+    num_workers_decodificacao = num_workers if modo == 'eager' else 0
+    with Decodificador(transform, num_workers_decodificacao,
+                       tamanho_reduzido=tamanho_reduzido) as decodificador:
+        for idx_classe, nome_classe in enumerate(classes):
+            arquivos = arquivos_por_classe[idx_classe]
+            
+            total_imagens = len(arquivos)
+            print(f"Classe '{nome_classe}': {total_imagens} imagens encontradas")
+            
+            if total_imagens == 0:
+                print(f"  ⚠️  Aviso: Nenhuma imagem encontrada em {nome_classe}")
+                continue
+            
+            # Embaralhar os arquivos
+            indices = np.random.permutation(total_imagens)
+            arquivos_embaralhados = [arquivos[i] for i in indices]
+            quantidade = min(imagens_treino + imagens_validacao, total_imagens)
+            
+            if modo == 'lazy':
+                # Apenas os caminhos de arquivos válidos; as imagens serão decodificadas
+                # pelo CropDataset
+                imagens_embaralhadas = selecionar_caminhos(arquivos_embaralhados, quantidade)
+            else:
+                # Decodificar somente os arquivos que entram em treino ou validação
+                imagens_embaralhadas = selecionar_imagens(arquivos_embaralhados, quantidade, transform,
+                                                          cache, decodificador)
+            
+            # Dividir em treino e validação
+            num_treino = min(imagens_treino, len(imagens_embaralhadas))
+            num_validacao = min(imagens_validacao, len(imagens_embaralhadas) - num_treino)
+            
+            # Treino
+            imagens_treino_lista.extend(imagens_embaralhadas[:num_treino])
+            labels_treino_lista.extend([idx_classe] * num_treino)
+            
+            # Validação
+            if num_validacao > 0:
+                imagens_validacao_lista.extend(imagens_embaralhadas[num_treino:num_treino + num_validacao])
+                labels_validacao_lista.extend([idx_classe] * num_validacao)
+            
+            print(f"  → Treino: {num_treino}, Validação: {num_validacao}")
     
     print(f"\nTotal de imagens de treino: {len(imagens_treino_lista)}")
     print(f"Total de imagens de validação: {len(imagens_validacao_lista)}")
     
+    if modo == 'lazy':
+        dataset_treino = None
+        dataset_validacao = None
+        if imagens_treino_lista:
+            dataset_treino = CropDataset(imagens_treino_lista, labels_treino_lista, transform,
+                                         tamanho_cache_mb, tamanho_reduzido)
+        if imagens_validacao_lista:
+            dataset_validacao = CropDataset(imagens_validacao_lista, labels_validacao_lista, transform,
+                                            tamanho_cache_mb, tamanho_reduzido)
+        return dataset_treino, dataset_validacao, classes
+    
     # Converter para tensores
     if imagens_treino_lista:
         tensor_imagens_treino = torch.stack(imagens_treino_lista)
@@ -181,5 +468,13 @@ def preparar_datasets(caminho_dataset, tamanho_imagem=224, imagens_treino=20, im
     else:
         dataset_validacao = None
     
+    if cache is not None:
+        print(f"Cache de tensores: {cache.acertos} imagens reaproveitadas, "
+              f"{cache.faltas} decodificadas")
+        try:
+            cache.salvar()
+        except Exception as e:
+            print(f"⚠️  Aviso: Não foi possível atualizar o cache de tensores: {e}")
+    
     return dataset_treino, dataset_validacao, classes
 
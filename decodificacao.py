@@ -0,0 +1,200 @@
+"""
+Módulo para decodificar imagens em paralelo usando um pool de processos.
+"""
+import zipfile
+import multiprocessing
+from io import BytesIO
+from PIL import Image
+import torch
+
+
+# Estado de cada processo do pool (preenchido pelo inicializador)
+_transform_worker = None
+_tamanho_reduzido_worker = None
+_zips_abertos = {}
+
+
+def _inicializar_worker(transform, tamanho_reduzido=None):
+    """Guarda as transformações no processo e evita disputa de threads entre workers."""
+    global _transform_worker, _tamanho_reduzido_worker
+    _transform_worker = transform
+    _tamanho_reduzido_worker = tamanho_reduzido
+    torch.set_num_threads(1)
+
+
+def abrir_imagem(arquivo, tamanho_reduzido=None):
+    """
+    Abre uma imagem e converte para RGB.
+
+    Com tamanho_reduzido, imagens JPEG são decodificadas diretamente em escala
+    reduzida (escalonamento DCT de 1/2, 1/4 ou 1/8 via Image.draft). A escala é
+    escolhida para que o resultado nunca fique menor que o tamanho pedido, então o
+    redimensionamento final continua sendo feito pelas transformações. Outros
+    formatos são decodificados normalmente.
+
+    Args:
+        arquivo: Caminho da imagem ou objeto de arquivo (ex.: BytesIO)
+        tamanho_reduzido: Tupla (largura, altura) mínima desejada ou None
+
+    Returns:
+        Imagem PIL em RGB
+    """
+    imagem = Image.open(arquivo)
+    if tamanho_reduzido is not None and imagem.format == 'JPEG':
+        imagem.draft('RGB', tamanho_reduzido)
+    return imagem.convert('RGB')
+
+
+def verificar_imagem(arquivo):
+    """
+    Verifica se um arquivo é uma imagem legível sem decodificar os pixels.
+
+    Usa Image.verify, que lê o cabeçalho e a estrutura do arquivo (e os checksums,
+    em formatos como PNG) sem manter a imagem na memória.
+
+    Args:
+        arquivo: Caminho da imagem ou objeto de arquivo
+
+    Returns:
+        Mensagem de erro ou None se a imagem for válida
+    """
+    try:
+        with Image.open(arquivo) as imagem:
+            imagem.verify()
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def _abrir_origem(origem, tamanho_reduzido=None):
+    """
+    Abre a imagem indicada por uma origem.
+
+    Args:
+        origem: Caminho do arquivo ou tupla (caminho_zip, nome_do_membro)
+        tamanho_reduzido: Tamanho mínimo para decodificação reduzida (ver abrir_imagem)
+
+    Returns:
+        Imagem PIL em RGB
+    """
+    if isinstance(origem, tuple):
+        caminho_zip, nome_arquivo = origem
+        zip_ref = _zips_abertos.get(caminho_zip)
+        if zip_ref is None:
+            zip_ref = zipfile.ZipFile(caminho_zip, 'r')
+            _zips_abertos[caminho_zip] = zip_ref
+        with zip_ref.open(nome_arquivo) as arquivo:
+            return abrir_imagem(BytesIO(arquivo.read()), tamanho_reduzido)
+
+    return abrir_imagem(origem, tamanho_reduzido)
+
+
+def _decodificar_com(transform, origem, tamanho_reduzido=None):
+    """
+    Decodifica uma única imagem no processo atual.
+
+    Returns:
+        tuple: (array da imagem ou None, mensagem de erro ou None)
+    """
+    try:
+        imagem = _abrir_origem(origem, tamanho_reduzido)
+        return transform(imagem).numpy(), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _decodificar(origem):
+    """Ponto de entrada dos processos do pool."""
+    return _decodificar_com(_transform_worker, origem, _tamanho_reduzido_worker)
+
+
+def _fechar_zips():
+    """Fecha os arquivos ZIP mantidos abertos pelo processo atual."""
+    for zip_ref in _zips_abertos.values():
+        zip_ref.close()
+    _zips_abertos.clear()
+
+
+def descrever_origem(origem):
+    """Retorna uma descrição legível da origem para mensagens de erro."""
+    if isinstance(origem, tuple):
+        return f"{origem[0]}:{origem[1]}"
+    return str(origem)
+
+
+class Decodificador:
+    """
+    Decodifica imagens sequencialmente ou com um pool de processos.
+
+    Os resultados são sempre devolvidos na mesma ordem das origens recebidas,
+    e o trabalho é distribuído em blocos (chunks) para reduzir a comunicação
+    entre processos. Com num_workers <= 1 a decodificação acontece no próprio
+    processo, sem criar o pool.
+    """
+
+    def __init__(self, transform, num_workers=0, tamanho_chunk=None, tamanho_reduzido=None):
+        """
+        Args:
+            transform: Transformações a serem aplicadas nas imagens
+            num_workers: Número de processos (0 ou 1 para decodificação sequencial)
+            tamanho_chunk: Imagens enviadas por vez a cada processo (None para automático)
+            tamanho_reduzido: Tupla (largura, altura) para decodificar JPEGs em escala
+                              reduzida antes do redimensionamento (None desativa)
+        """
+        self.transform = transform
+        self.num_workers = num_workers
+        self.tamanho_chunk = tamanho_chunk
+        self.tamanho_reduzido = tamanho_reduzido
+        self.pool = None
+
+        if num_workers > 1:
+            self.pool = multiprocessing.Pool(
+                num_workers,
+                initializer=_inicializar_worker,
+                initargs=(transform, tamanho_reduzido)
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+    def fechar(self):
+        """Encerra o pool de processos, se existir."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def decodificar(self, origens):
+        """
+        Decodifica uma lista de imagens preservando a ordem.
+
+        Args:
+            origens: Lista de caminhos de arquivo ou tuplas (caminho_zip, nome_do_membro)
+
+        Yields:
+            tuple: (origem, tensor da imagem ou None, mensagem de erro ou None)
+        """
+        origens = list(origens)
+        if not origens:
+            return
+
+        if self.pool is None:
+            try:
+                for origem in origens:
+                    array, erro = _decodificar_com(self.transform, origem, self.tamanho_reduzido)
+                    yield origem, None if array is None else torch.from_numpy(array), erro
+            finally:
+                _fechar_zips()
+            return
+
+        tamanho_chunk = self.tamanho_chunk
+        if tamanho_chunk is None:
+            tamanho_chunk = max(1, len(origens) // (self.num_workers * 4))
+
+        resultados = self.pool.imap(_decodificar, origens, chunksize=tamanho_chunk)
+        for origem, (array, erro) in zip(origens, resultados):
+            yield origem, None if array is None else torch.from_numpy(array), erro
+
@@ -3,46 +3,97 @@ Módulo para avaliar o modelo treinado.
 """
 import torch
 from torch.utils.data import DataLoader
+from metricas import AcumuladorMetricas
 
 
-def avaliar_modelo(cnn, dataset, threshold=0.5, device=None):
+def _dividir(numerador, denominador):
+    """Divisão elemento a elemento que retorna 0 onde o denominador é 0."""
+    return torch.where(denominador > 0, numerador / denominador.clamp(min=1), torch.zeros_like(numerador))
+
+
+def calcular_curva_limiares(histograma, limiares):
+    """
+    Calcula as métricas de cada limiar a partir do histograma das probabilidades.
+    
+    Args:
+        histograma: Tensor [2, len(limiares) + 1] com a contagem de amostras de cada
+                    classe real (0 e 1) por intervalo entre limiares consecutivos
+        limiares: Tensor crescente com os limiares da varredura
+        
+    Returns:
+        dict: Listas 'limiares', 'precisao', 'recall', 'f1' e 'acuracia' (uma posição por limiar)
+    """
+    # Amostras com probabilidade > limiares[j] são as dos intervalos j+1 em diante
+    acima = histograma.flip(1).cumsum(1).flip(1)[:, 1:].double()
+    totais = histograma.sum(1, keepdim=True).double()
+    falsos_positivos, verdadeiros_positivos = acima[0], acima[1]
+    verdadeiros_negativos = totais[0] - falsos_positivos
+    
+    precisao = _dividir(verdadeiros_positivos, verdadeiros_positivos + falsos_positivos)
+    recall = _dividir(verdadeiros_positivos, totais[1].expand_as(verdadeiros_positivos))
+    f1 = _dividir(2 * precisao * recall, precisao + recall)
+    acuracia = _dividir(verdadeiros_positivos + verdadeiros_negativos, totais.sum().expand_as(f1))
+    
+    return {
+        'limiares': limiares.tolist(),
+        'precisao': precisao.tolist(),
+        'recall': recall.tolist(),
+        'f1': f1.tolist(),
+        'acuracia': acuracia.tolist()
+    }
+
+
+def avaliar_modelo(cnn, dataset, threshold=0.5, device=None, batch_size=256, num_limiares=101):
     """
     Avalia o modelo e gera uma matriz de confusão.
     
+    Em uma única passada pelas saídas do modelo também é montado o histograma das
+    probabilidades por classe real, de onde saem precisão, recall e F1 de uma varredura
+    de limiares (curva precisão/recall) e o limiar de maior F1.
+    
     Args:
         cnn: Modelo treinado
         dataset: Dataset para avaliação
-        threshold: Limiar para classificação (padrão: 0.5)
+        threshold: Limiar da probabilidade de pássaro para classificação (padrão: 0.5)
         device: Dispositivo ('cpu' ou 'cuda'). Se None, detecta automaticamente.
+        batch_size: Tamanho do lote de avaliação
+        num_limiares: Número de limiares igualmente espaçados entre 0 e 1 na varredura
         
     Returns:
-        dict: Dicionário com a matriz de confusão e métricas
+        dict: Dicionário com a matriz de confusão, métricas, 'curva_limiares' e 'melhor_limiar'
     """
     if device is None:
         device = 'cuda' if torch.cuda.is_available() else 'cpu'
     
     cnn = cnn.to(device)
     cnn.eval()
-    train_loader = DataLoader(dataset, batch_size=1, shuffle=True)
+    # A ordem não altera as métricas, então não há embaralhamento
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=False)
     
-    # Matriz de confusão: [predito][real]
-    # [0][0] = verdadeiro negativo, [0][1] = falso negativo
-    # [1][0] = falso positivo, [1][1] = verdadeiro positivo
-    matriz_confusao = [[0, 0], [0, 0]]
+    # Acertos e matriz de confusão acumulados no dispositivo
+    metricas = AcumuladorMetricas(num_classes=2, device=device)
+    limiares = torch.linspace(0, 1, num_limiares, device=device)
+    histograma = torch.zeros(2 * (num_limiares + 1), dtype=torch.int64, device=device)
     
     with torch.no_grad():
-        for inputs, targets in train_loader:
+        for inputs, targets in loader:
             # Mover dados para o dispositivo apropriado
             inputs = inputs.to(device)
-            targets = targets.to(device)
+            rotulos = targets.to(device).reshape(-1).long()
             
-            x_hat = cnn(inputs)
-            classe_predita = 0
-            if x_hat[0] > threshold:
-                classe_predita = 1
+            # O modelo retorna logits; o limiar é aplicado à probabilidade
+            probabilidades = torch.sigmoid(cnn(inputs)).reshape(-1).float()
+            metricas.atualizar(probabilidades > threshold, rotulos)
             
-            classe_real = int(targets[0][0])
-            matriz_confusao[classe_predita][classe_real] += 1
+            # Intervalo de cada probabilidade entre os limiares, separado por classe real
+            intervalos = torch.bucketize(probabilidades, limiares)
+            histograma += torch.bincount(rotulos * (num_limiares + 1) + intervalos,
+                                         minlength=histograma.numel())
+    
+    # Matriz de confusão: [predito][real] (o acumulador usa [real][predito])
+    # [0][0] = verdadeiro negativo, [0][1] = falso negativo
+    # [1][0] = falso positivo, [1][1] = verdadeiro positivo
+    matriz_confusao = metricas.resultados()['matriz_confusao'].t().tolist()
     
     verdadeiros_positivos = matriz_confusao[1][1]
     verdadeiros_negativos = matriz_confusao[0][0]
@@ -54,6 +105,9 @@ def avaliar_modelo(cnn, dataset, threshold=0.5, device=None):
     precisao = verdadeiros_positivos / (verdadeiros_positivos + falsos_positivos) if (verdadeiros_positivos + falsos_positivos) > 0 else 0
     recall = verdadeiros_positivos / (verdadeiros_positivos + falsos_negativos) if (verdadeiros_positivos + falsos_negativos) > 0 else 0
     
+    curva = calcular_curva_limiares(histograma.view(2, num_limiares + 1).cpu(), limiares.cpu())
+    melhor = max(range(num_limiares), key=lambda i: curva['f1'][i])
+    
     resultados = {
         'matriz_confusao': matriz_confusao,
         'verdadeiros_positivos': verdadeiros_positivos,
@@ -62,7 +116,15 @@ def avaliar_modelo(cnn, dataset, threshold=0.5, device=None):
         'falsos_negativos': falsos_negativos,
         'acuracia': acuracia,
         'precisao': precisao,
-        'recall': recall
+        'recall': recall,
+        'curva_limiares': curva,
+        'melhor_limiar': {
+            'limiar': curva['limiares'][melhor],
+            'f1': curva['f1'][melhor],
+            'precisao': curva['precisao'][melhor],
+            'recall': curva['recall'][melhor],
+            'acuracia': curva['acuracia'][melhor]
+        }
     }
     
     return resultados
@@ -90,5 +152,17 @@ def imprimir_resultados(resultados):
     print(f"  Acurácia: {resultados['acuracia']:.4f}")
     print(f"  Precisão: {resultados['precisao']:.4f}")
     print(f"  Recall: {resultados['recall']:.4f}")
+    
+    curva = resultados.get('curva_limiares')
+    if curva:
+        print("\nCurva Precisão/Recall:")
+        print(f"  {'Limiar':>6} {'Precisão':>9} {'Recall':>7} {'F1':>7} {'Acurácia':>9}")
+        passo = max(1, (len(curva['limiares']) - 1) // 10)
+        for i in range(0, len(curva['limiares']), passo):
+            print(f"  {curva['limiares'][i]:>6.2f} {curva['precisao'][i]:>9.4f} {curva['recall'][i]:>7.4f} "
+                  f"{curva['f1'][i]:>7.4f} {curva['acuracia'][i]:>9.4f}")
+        melhor = resultados['melhor_limiar']
+        print(f"\nMelhor limiar (maior F1): {melhor['limiar']:.2f} - F1: {melhor['f1']:.4f}, "
+              f"Precisão: {melhor['precisao']:.4f}, Recall: {melhor['recall']:.4f}")
     print("="*50 + "\n")
 
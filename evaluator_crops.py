@@ -3,11 +3,13 @@ Módulo para avaliar o modelo treinado em classificação de culturas.
 """
 import torch
 from torch.utils.data import DataLoader
-import numpy as np
-from sklearn.metrics import confusion_matrix, classification_report
+from data_loader_crops import normalizar_lote
+from preparacao_modelo import preparar_modelo, converter_entrada
+from metricas import AcumuladorMetricas, relatorio_classificacao
 
 
-def avaliar_modelo(modelo, dataset, classes, device='cpu', batch_size=32):
+def avaliar_modelo(modelo, dataset, classes, device='cpu', batch_size=32,
+                   channels_last=False, compilar=False):
     """
     Avalia o modelo e gera métricas detalhadas.
     
@@ -17,45 +19,51 @@ def avaliar_modelo(modelo, dataset, classes, device='cpu', batch_size=32):
         classes: Lista com nomes das classes
         device: Dispositivo ('cpu' ou 'cuda')
         batch_size: Tamanho do lote
+        channels_last: Se True, usa o formato de memória channels_last no modelo e nas entradas
+        compilar: Se True, compila o modelo com torch.compile (volta ao modo eager se falhar)
         
     Returns:
         dict: Dicionário com métricas e matriz de confusão
     """
     modelo.eval()
     modelo = modelo.to(device)
+    executar = preparar_modelo(modelo, channels_last=channels_last, compilar=compilar)
     
     data_loader = DataLoader(dataset, batch_size=batch_size, shuffle=False)
     
-    todas_predicoes = []
-    todos_labels = []
+    metricas = AcumuladorMetricas(num_classes=len(classes), device=device)
+    # Predições e rótulos são gravados em tensores pré-alocados no dispositivo
+    total = len(dataset)
+    todas_predicoes = torch.empty(total, dtype=torch.int64, device=device)
+    todos_labels = torch.empty(total, dtype=torch.int64, device=device)
+    posicao = 0
     
     with torch.no_grad():
         for inputs, targets in data_loader:
-            inputs = inputs.to(device)
+            inputs = converter_entrada(normalizar_lote(inputs.to(device)), channels_last)
             targets = targets.to(device)
             
-            outputs = modelo(inputs)
+            outputs = executar(inputs)
             _, preditos = torch.max(outputs, 1)
             
-            todas_predicoes.extend(preditos.cpu().numpy())
-            todos_labels.extend(targets.cpu().numpy())
+            metricas.atualizar(preditos, targets)
+            n = targets.size(0)
+            todas_predicoes[posicao:posicao + n] = preditos
+            todos_labels[posicao:posicao + n] = targets
+            posicao += n
     
     # Calcular métricas
-    todas_predicoes = np.array(todas_predicoes)
-    todos_labels = np.array(todos_labels)
+    resultado = metricas.resultados()
+    todas_predicoes = todas_predicoes[:posicao].cpu().numpy()
+    todos_labels = todos_labels[:posicao].cpu().numpy()
     
-    acuracia = 100 * np.sum(todas_predicoes == todos_labels) / len(todos_labels)
+    acuracia = 100 * resultado['acuracia']
     
     # Matriz de confusão
-    matriz_confusao = confusion_matrix(todos_labels, todas_predicoes)
-    
-    # Relatório de classificação
-    relatorio = classification_report(
-        todos_labels, 
-        todas_predicoes, 
-        target_names=classes,
-        output_dict=True
-    )
+    matriz_confusao = resultado['matriz_confusao'].numpy()
+    
+    # Relatório de classificação (precisão, recall e F1 calculados da matriz)
+    relatorio = relatorio_classificacao(resultado['matriz_confusao'], classes)
     
     resultados = {
         'acuracia': acuracia,
@@ -0,0 +1,83 @@
+"""
+Script para empacotar um dataset em um único arquivo binário (ver formato_empacotado.py).
+
+O arquivo gerado pode ser usado por main.py e main_crops.py através da configuração
+caminho_empacotado, evitando abrir milhares de arquivos pequenos a cada execução.
+
+Uso:
+    python exportar_dataset.py culturas culturas_224.pidat [--tamanho 224] [--armazenamento uint8]
+    python exportar_dataset.py passaros passaros_32.pidat [--max-imagens 1000]
+"""
+import argparse
+import os
+import time
+from formato_empacotado import exportar_empacotado
+from data_loader import preparar_dataset
+from data_loader_crops import preparar_datasets
+
+
+def exportar_culturas(args):
+    """Empacota o dataset Agricultural-crops já dividido em treino e validação."""
+    dataset_treino, dataset_validacao, classes = preparar_datasets(
+        args.dataset or 'Agricultural-crops',
+        tamanho_imagem=args.tamanho,
+        imagens_treino=args.treino,
+        imagens_validacao=args.validacao,
+        num_workers=args.workers,
+        armazenamento=args.armazenamento
+    )
+    return exportar_empacotado(
+        args.saida,
+        {'treino': dataset_treino, 'validacao': dataset_validacao},
+        classes,
+        tipo_rotulo='classe'
+    )
+
+
+def exportar_passaros(args):
+    """Empacota as imagens de bird.zip e not-bird.zip."""
+    zip_passaros, zip_nao_passaros = args.dataset.split(',') if args.dataset else ('bird.zip', 'not-bird.zip')
+    dataset = preparar_dataset(zip_passaros, zip_nao_passaros, args.max_imagens, num_workers=args.workers)
+    return exportar_empacotado(
+        args.saida,
+        {'todos': dataset},
+        ['não-pássaro', 'pássaro'],
+        tipo_rotulo='binario'
+    )
+
+
+def main():
+    """Função principal."""
+    parser = argparse.ArgumentParser(description='Empacota um dataset em um único arquivo binário.')
+    parser.add_argument('tipo', choices=['culturas', 'passaros'], help='Dataset a exportar')
+    parser.add_argument('saida', help='Arquivo de saída')
+    parser.add_argument('--dataset', default=None,
+                        help="Pasta das culturas ou 'bird.zip,not-bird.zip' para pássaros")
+    parser.add_argument('--tamanho', type=int, default=224, help='Tamanho das imagens de culturas')
+    parser.add_argument('--treino', type=int, default=20, help='Imagens de treino por classe')
+    parser.add_argument('--validacao', type=int, default=12, help='Imagens de validação por classe')
+    parser.add_argument('--armazenamento', choices=['uint8', 'float32'], default='uint8',
+                        help='Tipo dos pixels das culturas (padrão: uint8, 4x menor)')
+    parser.add_argument('--max-imagens', type=int, default=1000, help='Imagens por classe (pássaros)')
+    parser.add_argument('--workers', type=int, default=0, help='Processos para decodificar as imagens')
+    args = parser.parse_args()
+    if args.tipo == 'passaros' and args.dataset is not None:
+        partes = [parte.strip() for parte in args.dataset.split(',')]
+        if len(partes) != 2 or not all(partes):
+            parser.error("para 'passaros', --dataset deve ter dois arquivos separados por "
+                         f"vírgula (ex.: 'bird.zip,not-bird.zip'), recebido '{args.dataset}'")
+        args.dataset = ','.join(partes)
+
+    inicio = time.time()
+    if args.tipo == 'culturas':
+        total = exportar_culturas(args)
+    else:
+        total = exportar_passaros(args)
+
+    tamanho_mb = os.path.getsize(args.saida) / (1024 * 1024)
+    print(f"\n✓ {total} imagens exportadas para '{args.saida}' "
+          f"({tamanho_mb:.1f} MB em {time.time() - inicio:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
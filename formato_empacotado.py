@@ -0,0 +1,207 @@
+"""
+Módulo para gravar e ler datasets empacotados em um único arquivo binário.
+
+Formato do arquivo:
+- 8 bytes com a assinatura MAGICO
+- 8 bytes (uint64, little-endian) com o tamanho do cabeçalho
+- Cabeçalho JSON (UTF-8) com classes, rótulos, partições, offsets e shapes
+- Preenchimento até um múltiplo de ALINHAMENTO bytes
+- Dados dos pixels já pré-processados, contíguos, na ordem das amostras
+"""
+import os
+import json
+import shutil
+import struct
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+
+MAGICO = b'PIADSET1'
+VERSAO = 1
+ALINHAMENTO = 64
+
+
+def exportar_empacotado(caminho_saida, particoes, classes, tipo_rotulo='classe'):
+    """
+    Grava um ou mais datasets em um único arquivo empacotado.
+
+    Args:
+        caminho_saida: Caminho do arquivo a ser criado
+        particoes: Dicionário {nome_da_particao: dataset}, ex.: {'treino': ..., 'validacao': ...}
+        classes: Lista com os nomes das classes
+        tipo_rotulo: 'classe' (índice inteiro, modelo de culturas) ou
+                     'binario' (tensor float [rótulo], modelo de pássaros)
+
+    Returns:
+        int: Número de amostras gravadas
+    """
+    rotulos = []
+    nomes_particoes = []
+    offsets = []
+    formatos = []
+    dtype = None
+    posicao = 0
+
+    # Os dados são gravados primeiro em um arquivo temporário porque o cabeçalho,
+    # que vem antes deles, só é conhecido depois de percorrer todas as amostras
+    caminho_dados = caminho_saida + '.dados.tmp'
+    with open(caminho_dados, 'wb') as f:
+        for nome_particao, dataset in particoes.items():
+            if dataset is None:
+                continue
+            for imagem, rotulo in dataset:
+                array = np.ascontiguousarray(imagem.numpy())
+                if dtype is None:
+                    dtype = array.dtype
+                elif array.dtype != dtype:
+                    raise ValueError(f"Todas as imagens devem ter o mesmo dtype ({dtype}), "
+                                     f"encontrado {array.dtype}")
+
+                f.write(array.tobytes())
+                offsets.append(posicao)
+                formatos.append(list(array.shape))
+                rotulos.append(int(torch.as_tensor(rotulo).flatten()[0].item()))
+                nomes_particoes.append(nome_particao)
+                posicao += array.nbytes
+
+    if dtype is None:
+        os.remove(caminho_dados)
+        raise ValueError("Nenhuma amostra para exportar")
+
+    cabecalho = json.dumps({
+        'versao': VERSAO,
+        'classes': list(classes),
+        'tipo_rotulo': tipo_rotulo,
+        'dtype': dtype.name,
+        'rotulos': rotulos,
+        'particoes': nomes_particoes,
+        'offsets': offsets,
+        'formatos': formatos,
+        'tamanho_dados': posicao
+    }).encode('utf-8')
+
+    inicio_dados = len(MAGICO) + 8 + len(cabecalho)
+    preenchimento = (-inicio_dados) % ALINHAMENTO
+
+    caminho_temp = caminho_saida + '.tmp'
+    with open(caminho_temp, 'wb') as saida:
+        saida.write(MAGICO)
+        saida.write(struct.pack('<Q', len(cabecalho)))
+        saida.write(cabecalho)
+        saida.write(b'\0' * preenchimento)
+        with open(caminho_dados, 'rb') as dados:
+            shutil.copyfileobj(dados, saida, 16 * 1024 * 1024)
+
+    os.remove(caminho_dados)
+    os.replace(caminho_temp, caminho_saida)
+    return len(rotulos)
+
+
+def ler_cabecalho(caminho):
+    """
+    Lê o cabeçalho de um arquivo empacotado.
+
+    Args:
+        caminho: Caminho do arquivo
+
+    Returns:
+        tuple: (dicionário do cabeçalho, posição em bytes do início dos dados)
+    """
+    with open(caminho, 'rb') as f:
+        if f.read(len(MAGICO)) != MAGICO:
+            raise ValueError(f"'{caminho}' não é um dataset empacotado")
+        tamanho_cabecalho = struct.unpack('<Q', f.read(8))[0]
+        cabecalho = json.loads(f.read(tamanho_cabecalho).decode('utf-8'))
+
+    if cabecalho.get('versao') != VERSAO:
+        raise ValueError(f"Versão do dataset empacotado não suportada: {cabecalho.get('versao')}")
+
+    inicio_dados = len(MAGICO) + 8 + tamanho_cabecalho
+    inicio_dados += (-inicio_dados) % ALINHAMENTO
+    return cabecalho, inicio_dados
+
+
+class DatasetEmpacotado(Dataset):
+    """
+    Dataset que lê um arquivo empacotado através de np.memmap.
+
+    Cada amostra é uma visão (sem cópia) da região do arquivo mapeada em memória;
+    o sistema operacional carrega apenas as páginas realmente acessadas.
+    """
+
+    def __init__(self, caminho, particao=None):
+        """
+        Args:
+            caminho: Caminho do arquivo gerado por exportar_empacotado
+            particao: Nome da partição a usar (ex.: 'treino'); None usa todas as amostras
+        """
+        self.caminho = caminho
+        cabecalho, self.inicio_dados = ler_cabecalho(caminho)
+
+        self.classes = cabecalho['classes']
+        self.tipo_rotulo = cabecalho['tipo_rotulo']
+        self.dtype = np.dtype(cabecalho['dtype'])
+        self.tamanho_dados = cabecalho['tamanho_dados']
+
+        indices = [
+            i for i, nome in enumerate(cabecalho['particoes'])
+            if particao is None or nome == particao
+        ]
+        self.offsets = [cabecalho['offsets'][i] // self.dtype.itemsize for i in indices]
+        self.formatos = [tuple(cabecalho['formatos'][i]) for i in indices]
+        self.tamanhos = [int(np.prod(formato)) for formato in self.formatos]
+
+        if self.tipo_rotulo == 'binario':
+            self.rotulos = torch.tensor([[cabecalho['rotulos'][i]] for i in indices], dtype=torch.float32)
+        else:
+            self.rotulos = torch.tensor([cabecalho['rotulos'][i] for i in indices], dtype=torch.long)
+
+        self._dados = None
+
+    @property
+    def dados(self):
+        # Aberto sob demanda para que cada worker do DataLoader tenha o próprio mapeamento
+        if self._dados is None:
+            # mode='c' (copy-on-write) gera arrays graváveis sem alterar o arquivo
+            self._dados = np.memmap(self.caminho, dtype=self.dtype, mode='c',
+                                    offset=self.inicio_dados,
+                                    shape=(self.tamanho_dados // self.dtype.itemsize,))
+        return self._dados
+
+    def __getstate__(self):
+        # Não serializar o memmap (seria copiado inteiro para cada worker)
+        estado = self.__dict__.copy()
+        estado['_dados'] = None
+        return estado
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, idx):
+        inicio = self.offsets[idx]
+        array = self.dados[inicio:inicio + self.tamanhos[idx]].reshape(self.formatos[idx])
+        return torch.from_numpy(array), self.rotulos[idx]
+
+
+def carregar_datasets_empacotados(caminho):
+    """
+    Abre as partições de treino e validação de um arquivo empacotado de culturas.
+
+    Args:
+        caminho: Caminho do arquivo gerado por exportar_empacotado
+
+    Returns:
+        tuple: (dataset_treino, dataset_validacao, lista_classes)
+    """
+    dataset_treino = DatasetEmpacotado(caminho, 'treino')
+    dataset_validacao = DatasetEmpacotado(caminho, 'validacao')
+
+    print(f"Dataset empacotado '{caminho}': {len(dataset_treino)} imagens de treino, "
+          f"{len(dataset_validacao)} de validação, {len(dataset_treino.classes)} classes")
+
+    return (
+        dataset_treino if len(dataset_treino) > 0 else None,
+        dataset_validacao if len(dataset_validacao) > 0 else None,
+        dataset_treino.classes
+    )
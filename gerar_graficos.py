@@ -25,6 +25,10 @@ def main():
         print(f"  - Épocas: {len(historico['treino_loss'])}")
         if 'melhor_acc_validacao' in historico:
             print(f"  - Melhor acurácia de validação: {historico['melhor_acc_validacao']:.2f}%")
+        if 'parada' in historico:
+            parada = historico['parada']
+            print(f"  - Parada: {parada['motivo']} na época {parada['epoca']}/{parada['epocas_configuradas']} "
+                  f"(tempo economizado estimado: {parada['tempo_economizado_s'] / 60:.1f} min)")
         
         print("\nGerando gráficos...")
         plotar_curvas_treinamento(historico, 'curvas_treinamento.png')
@@ -1,11 +1,16 @@
 """
 Script principal para executar o treinamento e avaliação do modelo de classificação de pássaros.
 """
+import argparse
+import random
 import torch
 from model import RedeCnnBirdNotBird
 from data_loader import preparar_dataset
+from formato_empacotado import DatasetEmpacotado
 from trainer import treinar_rede
+from checkpoint import carregar_checkpoint, definir_semente
 from evaluator import avaliar_modelo, imprimir_resultados
+from ajuste_threads import ajustar_threads
 
 
 def main():
@@ -16,6 +21,13 @@ def main():
     3. Treina o modelo
     4. Avalia o modelo
     """
+    parser = argparse.ArgumentParser(description='Treina e avalia o modelo de pássaros.')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continua o treino a partir do checkpoint em caminho_checkpoint')
+    parser.add_argument('--ajustar-threads', action='store_true',
+                        help='Mede e aplica o número de threads de cálculo mais rápido na CPU')
+    args = parser.parse_args()
+    
     # Configurações
     zip_path_passaros = 'bird.zip'
     zip_path_nao_passaros = 'not-bird.zip'
@@ -23,22 +35,55 @@ def main():
     epochs = 100
     learning_rate = 0.000001
     batch_size = 64
+    passos_acumulacao = 1  # Lotes somados por passo do otimizador (lote efetivo = batch_size x passos)
+    num_workers_decodificacao = 0  # Processos para decodificar imagens (0 = sequencial)
+    decodificacao_reduzida = False  # True decodifica JPEGs já em escala reduzida (DCT)
+    modo_streaming = False  # True lê as imagens dos ZIPs durante o treino (memória constante)
+    tamanho_buffer = 1000  # Buffer de embaralhamento do modo streaming
+    num_workers_dataloader = 0  # Workers do DataLoader (dividem os ZIPs no modo streaming)
+    caminho_empacotado = None  # Arquivo gerado por exportar_dataset.py (substitui os ZIPs)
+    channels_last = False  # Formato de memória NHWC (convoluções mais rápidas em muitas CPUs)
+    compilar_modelo = False  # Compila o modelo com torch.compile (volta ao eager se falhar)
+    caminho_checkpoint = 'checkpoint_passaros.pth'  # Estado completo do treino (None desativa)
+    intervalo_checkpoint = 10  # Épocas entre checkpoints completos
+    semente = None  # None sorteia uma semente (gravada no checkpoint)
+    ajustar_threads_cpu = False  # Mede o número de threads mais rápido (escolha fica em cache)
+    
+    if args.ajustar_threads:
+        ajustar_threads_cpu = True
     
     # Detectar dispositivo
     device = 'cuda' if torch.cuda.is_available() else 'cpu'
     print(f"GPU está {'disponível' if device == 'cuda' else 'NÃO disponível'}")
     print(f"Usando dispositivo: {device}\n")
     
+    # Semente aleatória: ao retomar, a do checkpoint reproduz a mesma divisão dos dados
+    checkpoint = carregar_checkpoint(caminho_checkpoint) if args.resume and caminho_checkpoint else None
+    if checkpoint is not None:
+        semente = checkpoint['metadados'].get('semente', semente)
+    if semente is None:
+        semente = random.randrange(2**31)
+    definir_semente(semente)
+    print(f"Semente aleatória: {semente}\n")
+    
     # Carregar e preparar dados
     print("="*50)
     print("CARREGANDO DADOS")
     print("="*50)
-    dataset = preparar_dataset(
-        zip_path_passaros,
-        zip_path_nao_passaros,
-        max_imagens_por_classe,
-        device
-    )
+    if caminho_empacotado:
+        dataset = DatasetEmpacotado(caminho_empacotado)
+        print(f"Dataset empacotado '{caminho_empacotado}': {len(dataset)} imagens")
+    else:
+        dataset = preparar_dataset(
+            zip_path_passaros,
+            zip_path_nao_passaros,
+            max_imagens_por_classe,
+            device,
+            num_workers=num_workers_decodificacao,
+            streaming=modo_streaming,
+            tamanho_buffer=tamanho_buffer,
+            decodificacao_reduzida=decodificacao_reduzida
+        )
     
     # Criar modelo
     print("\n" + "="*50)
@@ -47,6 +92,11 @@ def main():
     cnn = RedeCnnBirdNotBird().to(device)
     print("Modelo criado e movido para", device)
     
+    # Threads de cálculo: os workers do DataLoader reservam núcleos para a decodificação
+    if ajustar_threads_cpu and device == 'cpu':
+        ajustar_threads(cnn, (batch_size, 3, 32, 32), channels_last=channels_last,
+                        workers=num_workers_dataloader)
+    
     # Treinar modelo
     print("\n" + "="*50)
     print("TREINANDO MODELO")
@@ -57,7 +107,15 @@ def main():
         epochs=epochs,
         learning_rate=learning_rate,
         batch_size=batch_size,
-        device=device
+        passos_acumulacao=passos_acumulacao,
+        device=device,
+        num_workers=num_workers_dataloader,
+        channels_last=channels_last,
+        compilar=compilar_modelo,
+        caminho_checkpoint=caminho_checkpoint,
+        intervalo_checkpoint=intervalo_checkpoint,
+        checkpoint=checkpoint,
+        metadados={'semente': semente}
     )
     
     # Avaliar modelo
@@ -1,11 +1,19 @@
 """
 Script principal para executar o treinamento e avaliação do modelo de classificação de culturas agrícolas.
 """
+import argparse
+import copy
 import json
+import random
 import torch
 from model_crops import RedeCnnCulturasAgricolas
 from data_loader_crops import preparar_datasets
-from trainer_crops import treinar_rede
+from formato_empacotado import carregar_datasets_empacotados
+from trainer_crops import treinar_rede, imprimir_comparacao_precisao
+from checkpoint import carregar_checkpoint, definir_semente
+from treino_distribuido import treinar_rede_distribuido
+from aumentacao import AumentacaoLote
+from ajuste_threads import ajustar_threads
 from evaluator_crops import avaliar_modelo, imprimir_resultados
 from visualizador import plotar_curvas_treinamento, plotar_curvas_combinadas
 
@@ -18,6 +26,15 @@ def main():
     3. Treina o modelo
     4. Avalia o modelo
     """
+    parser = argparse.ArgumentParser(description='Treina e avalia o modelo de culturas agrícolas.')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continua o treino a partir do checkpoint em caminho_checkpoint')
+    parser.add_argument('--processos', type=int, default=None,
+                        help='Processos de treino distribuído na CPU (substitui num_processos)')
+    parser.add_argument('--ajustar-threads', action='store_true',
+                        help='Mede e aplica o número de threads de cálculo mais rápido na CPU')
+    args = parser.parse_args()
+    
     # Configurações
     caminho_dataset = 'Agricultural-crops'
     tamanho_imagem = 224
@@ -27,6 +44,37 @@ def main():
     learning_rate = 0.00001
     batch_size = 64
     num_classes = 30
+    diretorio_cache = '.cache_culturas'  # None para desativar o cache de tensores
+    num_workers_decodificacao = 0  # Processos para decodificar imagens (0 = sequencial)
+    decodificacao_reduzida = False  # True decodifica JPEGs já em escala reduzida (DCT)
+    armazenamento = 'float32'  # 'uint8' usa 4x menos memória e normaliza a cada lote
+    modo_dataset = 'eager'  # 'lazy' decodifica sob demanda com cache LRU limitado
+    tamanho_cache_mb = 512  # Limite do cache LRU de cada dataset no modo 'lazy'
+    num_workers_dataloader = 0  # Workers do DataLoader (recomendado no modo 'lazy')
+    caminho_empacotado = None  # Arquivo gerado por exportar_dataset.py (substitui a pasta)
+    usar_aumentacao = False  # Recorte, flips e cores aplicados a cada lote de treino
+    mixup_alpha = 0.0  # > 0 ativa mixup (ex.: 0.2); requer usar_aumentacao
+    cutmix_alpha = 0.0  # > 0 ativa cutmix (ex.: 1.0); requer usar_aumentacao
+    precisao = 'float32'  # 'bfloat16' usa autocast (CPUs com AVX-512 BF16/AMX, GPUs recentes)
+    comparar_precisao = False  # True treina antes uma referência em float32 e compara
+    channels_last = False  # Formato de memória NHWC (convoluções mais rápidas em muitas CPUs)
+    compilar_modelo = False  # Compila o modelo com torch.compile (volta ao eager se falhar)
+    caminho_checkpoint = 'checkpoint_culturas.pth'  # Estado completo do treino (None desativa)
+    intervalo_checkpoint = 10  # Épocas entre checkpoints completos
+    semente = None  # None sorteia uma semente (gravada no checkpoint)
+    monitorar = 'validacao_loss'  # Métrica da parada antecipada ('validacao_loss' ou 'validacao_acc')
+    paciencia = None  # Épocas sem melhora antes de parar, ex.: 50 (None desativa a parada antecipada)
+    min_delta = 0.001  # Melhora mínima da métrica monitorada
+    agendador_lr = None  # None (taxa fixa), 'plateau' (reduz a taxa na estagnação) ou 'cosseno'
+    paciencia_lr = 10  # Épocas sem melhora antes de reduzir a taxa ('plateau')
+    fator_lr = 0.5  # Fator de redução da taxa ('plateau')
+    num_processos = 1  # > 1 treina com vários processos na CPU (DDP sobre gloo)
+    ajustar_threads_cpu = False  # Mede o número de threads mais rápido (escolha fica em cache)
+    
+    if args.processos is not None:
+        num_processos = args.processos
+    if args.ajustar_threads:
+        ajustar_threads_cpu = True
     
     # Detectar dispositivo
     device = 'cuda' if torch.cuda.is_available() else 'cpu'
@@ -36,16 +84,34 @@ def main():
     print(f"\nGPU está {'disponível' if device == 'cuda' else 'NÃO disponível'}")
     print(f"Usando dispositivo: {device}\n")
     
+    # Semente aleatória: ao retomar, a do checkpoint reproduz a mesma divisão dos dados
+    checkpoint = carregar_checkpoint(caminho_checkpoint) if args.resume and caminho_checkpoint else None
+    if checkpoint is not None:
+        semente = checkpoint['metadados'].get('semente', semente)
+    if semente is None:
+        semente = random.randrange(2**31)
+    definir_semente(semente)
+    print(f"Semente aleatória: {semente}\n")
+    
     # Carregar e preparar dados
     print("="*70)
     print("CARREGANDO DADOS")
     print("="*70)
-    dataset_treino, dataset_validacao, classes = preparar_datasets(
-        caminho_dataset,
-        tamanho_imagem=tamanho_imagem,
-        imagens_treino=imagens_treino,
-        imagens_validacao=imagens_validacao
-    )
+    if caminho_empacotado:
+        dataset_treino, dataset_validacao, classes = carregar_datasets_empacotados(caminho_empacotado)
+    else:
+        dataset_treino, dataset_validacao, classes = preparar_datasets(
+            caminho_dataset,
+            tamanho_imagem=tamanho_imagem,
+            imagens_treino=imagens_treino,
+            imagens_validacao=imagens_validacao,
+            diretorio_cache=diretorio_cache,
+            num_workers=num_workers_decodificacao,
+            decodificacao_reduzida=decodificacao_reduzida,
+            armazenamento=armazenamento,
+            modo=modo_dataset,
+            tamanho_cache_mb=tamanho_cache_mb
+        )
     
     if dataset_treino is None or dataset_validacao is None:
         print("ERRO: Não foi possível carregar os datasets!")
@@ -67,19 +133,98 @@ def main():
     print(f"Parâmetros treináveis: {trainable_params:,}")
     print(f"Modelo criado e movido para {device}")
     
+    aumentacao = None
+    if usar_aumentacao:
+        aumentacao = AumentacaoLote(
+            num_classes=len(classes),
+            mixup_alpha=mixup_alpha,
+            cutmix_alpha=cutmix_alpha
+        )
+    
+    # Threads de cálculo: os núcleos são divididos entre os processos de treino e os
+    # workers do DataLoader
+    threads_por_processo = None
+    if ajustar_threads_cpu and (device == 'cpu' or num_processos > 1):
+        print()
+        threads_por_processo = ajustar_threads(
+            modelo.cpu(),
+            (max(1, batch_size // num_processos), *dataset_treino[0][0].shape),
+            channels_last=channels_last,
+            workers=num_workers_dataloader * num_processos,
+            processos=num_processos
+        )
+    
+    historico_referencia = None
+    if comparar_precisao and precisao != 'float32' and checkpoint is None:
+        # Mesmos pesos iniciais nos dois treinos para a comparação ser justa
+        estado_inicial = copy.deepcopy(modelo.state_dict())
+        print("\n" + "="*70)
+        print("TREINANDO REFERÊNCIA (float32)")
+        print("="*70)
+        _, historico_referencia = treinar_rede(
+            modelo,
+            dataset_treino,
+            dataset_validacao,
+            epochs=epochs,
+            learning_rate=learning_rate,
+            batch_size=batch_size,
+            device=device,
+            num_workers=num_workers_dataloader,
+            aumentacao=aumentacao,
+            precisao='float32',
+            channels_last=channels_last,
+            compilar=compilar_modelo
+        )
+        modelo.load_state_dict(estado_inicial)
+    
     # Treinar modelo
     print("\n" + "="*70)
-    print("TREINANDO MODELO")
+    print(f"TREINANDO MODELO ({precisao})")
     print("="*70)
-    modelo_treinado, historico = treinar_rede(
-        modelo,
-        dataset_treino,
-        dataset_validacao,
+    opcoes_treino = dict(
         epochs=epochs,
         learning_rate=learning_rate,
         batch_size=batch_size,
-        device=device
+        num_workers=num_workers_dataloader,
+        aumentacao=aumentacao,
+        precisao=precisao,
+        channels_last=channels_last,
+        compilar=compilar_modelo,
+        caminho_checkpoint=caminho_checkpoint,
+        intervalo_checkpoint=intervalo_checkpoint,
+        checkpoint=checkpoint,
+        metadados={'semente': semente},
+        monitorar=monitorar,
+        paciencia=paciencia,
+        min_delta=min_delta,
+        agendador_lr=agendador_lr,
+        paciencia_lr=paciencia_lr,
+        fator_lr=fator_lr
     )
+    if num_processos > 1:
+        # Os processos de treino gravam checkpoints e o melhor modelo apenas no processo 0;
+        # histórico, gráficos e modelo final são gravados aqui, no processo principal
+        print(f"Treino distribuído com {num_processos} processos (gloo, CPU)\n")
+        modelo_treinado, historico = treinar_rede_distribuido(
+            modelo, dataset_treino, dataset_validacao,
+            num_processos=num_processos, threads_por_processo=threads_por_processo,
+            semente=semente, **opcoes_treino
+        )
+    else:
+        modelo_treinado, historico = treinar_rede(
+            modelo, dataset_treino, dataset_validacao, device=device, **opcoes_treino
+        )
+    
+    # Salvar histórico (inclui o motivo e a época da parada)
+    with open('historico_treinamento.json', 'w', encoding='utf-8') as f:
+        json.dump(historico, f, indent=2)
+    print("Histórico salvo em 'historico_treinamento.json'")
+    
+    if historico_referencia is not None:
+        print("\n" + "="*70)
+        print(f"COMPARAÇÃO float32 x {precisao}")
+        print("="*70)
+        imprimir_comparacao_precisao(historico_referencia, historico, precisao)
     
     # Avaliar modelo no conjunto de validação
     print("\n" + "="*70)
@@ -90,7 +235,9 @@ def main():
         dataset_validacao,
         classes,
         device=device,
-        batch_size=batch_size
+        batch_size=batch_size,
+        channels_last=channels_last,
+        compilar=compilar_modelo
     )
     imprimir_resultados(resultados, classes)
     
@@ -0,0 +1,139 @@
+"""
+Módulo para acumular métricas de treino e avaliação sem sincronizar com o dispositivo
+a cada lote.
+"""
+import torch
+import torch.distributed as dist
+
+
+class AcumuladorMetricas:
+    """
+    Acumula soma das perdas, acertos e matriz de confusão como tensores no dispositivo.
+
+    Chamar .item() ou .cpu() a cada lote força a CPU a esperar a GPU terminar (e, na
+    CPU, interrompe o encadeamento das operações). Aqui todas as somas ficam no
+    dispositivo e os valores só são lidos uma vez, em resultados(), ao final da época.
+    """
+
+    def __init__(self, num_classes=None, device='cpu'):
+        """
+        Args:
+            num_classes: Número de classes da matriz de confusão (None não calcula a matriz)
+            device: Dispositivo onde os tensores das predições estarão
+        """
+        self.num_classes = num_classes
+        self.device = device
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Zera todos os acumuladores (ex.: no início de uma época)."""
+        self.soma_perdas = torch.zeros((), dtype=torch.float64, device=self.device)
+        self.corretos = torch.zeros((), dtype=torch.int64, device=self.device)
+        self.amostras = 0
+        self.matriz = None
+        if self.num_classes is not None:
+            self.matriz = torch.zeros(self.num_classes, self.num_classes, dtype=torch.int64, device=self.device)
+
+    def atualizar(self, preditos, rotulos, perda=None):
+        """
+        Adiciona um lote às métricas.
+
+        Args:
+            preditos: Tensor com as classes preditas (índices inteiros)
+            rotulos: Tensor com as classes reais, com o mesmo número de elementos
+            perda: Perda média do lote (tensor escalar), ou None
+        """
+        preditos = preditos.reshape(-1).long()
+        rotulos = rotulos.reshape(-1).long()
+        n = rotulos.numel()
+
+        if perda is not None:
+            self.soma_perdas += perda.detach().double() * n
+        self.corretos += (preditos == rotulos).sum()
+        self.amostras += n
+
+        if self.matriz is not None:
+            # Matriz [real][predito] via bincount dos índices combinados
+            indices = rotulos * self.num_classes + preditos
+            self.matriz += torch.bincount(indices, minlength=self.num_classes ** 2).view(
+                self.num_classes, self.num_classes)
+
+    def sincronizar(self):
+        """
+        Soma as métricas de todos os processos de um treino distribuído.
+
+        Deve ser chamado por todos os processos do grupo, antes de resultados().
+        """
+        amostras = torch.tensor(self.amostras, dtype=torch.int64, device=self.device)
+        for tensor in (self.soma_perdas, self.corretos, amostras):
+            dist.all_reduce(tensor)
+        if self.matriz is not None:
+            dist.all_reduce(self.matriz)
+        self.amostras = int(amostras.item())
+
+    def resultados(self):
+        """
+        Lê as métricas acumuladas (único ponto de sincronização com o dispositivo).
+
+        Returns:
+            dict: 'perda' (média por amostra), 'acuracia' (fração entre 0 e 1),
+                  'corretos', 'amostras' e 'matriz_confusao' (tensor na CPU ou None)
+        """
+        amostras = max(self.amostras, 1)
+        corretos = int(self.corretos.item())
+        return {
+            'perda': self.soma_perdas.item() / amostras,
+            'acuracia': corretos / amostras,
+            'corretos': corretos,
+            'amostras': self.amostras,
+            'matriz_confusao': self.matriz.cpu() if self.matriz is not None else None
+        }
+
+
+def relatorio_classificacao(matriz_confusao, classes):
+    """
+    Calcula precisão, recall e F1 de cada classe a partir da matriz de confusão.
+
+    O dicionário tem o mesmo formato de sklearn.metrics.classification_report com
+    output_dict=True (classes sem predições ou sem amostras têm métrica 0).
+
+    Args:
+        matriz_confusao: Tensor [real][predito] com as contagens
+        classes: Lista com nomes das classes, na ordem dos índices
+
+    Returns:
+        dict: Uma entrada por classe e 'accuracy', 'macro avg' e 'weighted avg'; cada
+              entrada tem 'precision', 'recall', 'f1-score' e 'support'
+    """
+    matriz = torch.as_tensor(matriz_confusao).double()
+    acertos = matriz.diagonal()
+    suporte = matriz.sum(1)
+    preditos = matriz.sum(0)
+
+    def dividir(numerador, denominador):
+        return torch.where(denominador > 0, numerador / denominador.clamp(min=1e-12),
+                           torch.zeros_like(numerador))
+
+    precisao = dividir(acertos, preditos)
+    recall = dividir(acertos, suporte)
+    f1 = dividir(2 * precisao * recall, precisao + recall)
+    total = suporte.sum()
+    pesos = dividir(suporte, total.expand_as(suporte))
+
+    relatorio = {}
+    for i, classe in enumerate(classes):
+        relatorio[classe] = {
+            'precision': precisao[i].item(),
+            'recall': recall[i].item(),
+            'f1-score': f1[i].item(),
+            'support': int(suporte[i].item())
+        }
+    relatorio['accuracy'] = (acertos.sum() / total).item() if total > 0 else 0.0
+    for nome, media in (('macro avg', lambda x: x.mean()), ('weighted avg', lambda x: (x * pesos).sum())):
+        relatorio[nome] = {
+            'precision': media(precisao).item(),
+            'recall': media(recall).item(),
+            'f1-score': media(f1).item(),
+            'support': int(total.item())
+        }
+    return relatorio
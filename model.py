@@ -35,7 +35,8 @@ class RedeCnnBirdNotBird(nn.Module):
             x: Tensor de entrada com shape [batch_size, 3, 32, 32]
             
         Returns:
-            Tensor de saída com shape [batch_size, 1]
+            Tensor de logits com shape [batch_size, 1] (aplicar sigmoid para obter a
+            probabilidade de pássaro)
         """
         x = self.conv1(x)
         x = self.conv2(x)
@@ -46,7 +47,7 @@ class RedeCnnBirdNotBird(nn.Module):
         x = torch.flatten(x, start_dim=1)
         
         x = torch.relu(self.linear1(x))
-        x = torch.relu(self.linear2(x))
+        x = self.linear2(x)
         
         return x
 
@@ -0,0 +1,101 @@
+"""
+Módulo para preparar os modelos para execução: formato de memória channels_last
+e compilação opcional com torch.compile.
+"""
+import torch
+
+
+def _erros_compilacao():
+    """
+    Retorna as exceções que indicam falha do compilador (TorchDynamo e backends).
+
+    Erros do próprio modelo ou da entrada não estão incluídos e devem ser propagados.
+    """
+    try:
+        from torch._dynamo.exc import TorchDynamoException
+    except ImportError:
+        return ()
+    return (TorchDynamoException,)
+
+
+class ExecucaoCompilada:
+    """
+    Executa o forward com o modelo compilado e, se a compilação falhar, volta para o
+    modelo original.
+
+    O torch.compile só compila de fato na primeira chamada (e ao encontrar shapes
+    novos), então erros de compilação aparecem aqui e não em preparar_modelo. Apenas
+    erros do compilador desativam a compilação; os demais (ex.: falta de memória ou
+    entrada inválida) são propagados normalmente.
+    """
+
+    def __init__(self, modelo, compilado):
+        """
+        Args:
+            modelo: Modelo original (nn.Module)
+            compilado: Resultado de torch.compile(modelo)
+        """
+        self.modelo = modelo
+        self.compilado = compilado
+        self.erros_compilacao = _erros_compilacao()
+
+    def __call__(self, *args, **kwargs):
+        if self.compilado is not None:
+            try:
+                return self.compilado(*args, **kwargs)
+            except self.erros_compilacao as e:
+                print(f"⚠️  Aviso: Falha ao executar o modelo compilado, usando o modo eager: {e}")
+                self.compilado = None
+        return self.modelo(*args, **kwargs)
+
+
+def preparar_modelo(modelo, channels_last=False, compilar=False):
+    """
+    Prepara um modelo (já no dispositivo final) para treino ou inferência.
+
+    O modelo original continua sendo o dono dos parâmetros: state_dict(), train(),
+    eval() e o otimizador devem usar o modelo original. O objeto retornado serve
+    apenas para executar o forward.
+
+    Args:
+        modelo: Modelo (nn.Module) já movido para o dispositivo
+        channels_last: Se True, converte os pesos para o formato channels_last (NHWC);
+                       as entradas devem ser convertidas com converter_entrada
+        compilar: Se True, tenta compilar o modelo com torch.compile
+
+    Returns:
+        Objeto chamável que executa o forward do modelo
+    """
+    if channels_last:
+        modelo.to(memory_format=torch.channels_last)
+
+    if not compilar:
+        return modelo
+
+    if not hasattr(torch, 'compile'):
+        print("⚠️  Aviso: torch.compile não está disponível nesta versão do PyTorch, usando o modo eager")
+        return modelo
+
+    try:
+        compilado = torch.compile(modelo)
+    except Exception as e:
+        print(f"⚠️  Aviso: Não foi possível compilar o modelo, usando o modo eager: {e}")
+        return modelo
+
+    return ExecucaoCompilada(modelo, compilado)
+
+
+def converter_entrada(inputs, channels_last=False):
+    """
+    Converte um lote de imagens para o formato de memória usado pelo modelo.
+
+    Args:
+        inputs: Tensor [batch_size, canais, altura, largura]
+        channels_last: Se o modelo foi preparado com channels_last
+
+    Returns:
+        Tensor no formato de memória adequado
+    """
+    if channels_last and inputs.dim() == 4:
+        return inputs.contiguous(memory_format=torch.channels_last)
+    return inputs
@@ -0,0 +1,403 @@
+"""
+Servidor HTTP de inferência do modelo de culturas, com o modelo carregado uma única vez.
+
+As requisições que chegam ao mesmo tempo são agrupadas em micro-lotes: o primeiro
+pedido da fila espera no máximo --espera-ms milissegundos por outros, até --max-lote
+imagens, e todas passam juntas pelo modelo.
+
+Rotas:
+    POST /classificar?top_k=5   Corpo com os bytes da imagem (ou multipart/form-data)
+    GET  /metricas              Percentis de latência e histograma dos tamanhos de lote
+    GET  /saude                 Verificação simples de funcionamento
+
+Exemplo:
+    python servidor_inferencia.py modelo_final_culturas.pth --porta 8000
+    curl --data-binary @imagem.jpg http://127.0.0.1:8000/classificar
+"""
+import argparse
+import asyncio
+import collections
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from email.policy import HTTP
+from io import BytesIO
+from urllib.parse import urlsplit, parse_qs
+import torch
+from classificar_imagem import carregar_modelo, carregar_classes, preprocessar_imagem
+from preparacao_modelo import preparar_modelo, converter_entrada
+from ajuste_threads import ajustar_threads
+
+TAMANHO_MAXIMO_CORPO = 20 * 2**20
+STATUS_HTTP = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class EstatisticasServidor:
+    """Guarda as latências recentes e a contagem de lotes por tamanho."""
+
+    def __init__(self, janela=10000):
+        """
+        Args:
+            janela: Número de latências mais recentes usadas nos percentis
+        """
+        self.latencias_ms = collections.deque(maxlen=janela)
+        self.tamanhos_lote = collections.Counter()
+        self.requisicoes = 0
+        self.erros = 0
+        self.inicio = time.time()
+
+    def registrar_lote(self, tamanho):
+        """Conta um lote executado pelo modelo."""
+        self.tamanhos_lote[tamanho] += 1
+
+    def registrar_requisicao(self, latencia_ms, erro=False):
+        """Registra a latência de uma requisição de classificação."""
+        self.requisicoes += 1
+        if erro:
+            self.erros += 1
+        else:
+            self.latencias_ms.append(latencia_ms)
+
+    def resumo(self):
+        """
+        Returns:
+            dict: Requisições, erros, percentis de latência (p50, p90, p95, p99 e máximo,
+                  em ms) e histograma {tamanho do lote: número de lotes}
+        """
+        latencias = sorted(self.latencias_ms)
+        percentis = {}
+        for p in (50, 90, 95, 99):
+            # Percentil pelo posto mais próximo
+            percentis[f'p{p}'] = latencias[max(0, -(-p * len(latencias) // 100) - 1)] if latencias else None
+        percentis['max'] = latencias[-1] if latencias else None
+        lotes = sum(self.tamanhos_lote.values())
+        imagens = sum(t * n for t, n in self.tamanhos_lote.items())
+        return {
+            'requisicoes': self.requisicoes,
+            'erros': self.erros,
+            'tempo_ativo_s': time.time() - self.inicio,
+            'latencia_ms': percentis,
+            'lotes': lotes,
+            'lote_medio': imagens / lotes if lotes else None,
+            'histograma_lotes': {str(t): self.tamanhos_lote[t] for t in sorted(self.tamanhos_lote)}
+        }
+
+
+class LoteadorDinamico:
+    """
+    Agrupa imagens de requisições concorrentes em micro-lotes para o modelo.
+
+    Cada requisição coloca sua imagem em uma fila asyncio e espera um Future. Uma
+    única tarefa retira da fila o primeiro pedido, espera até max_espera_ms por outros
+    (no máximo max_lote) e executa o lote em uma thread separada, para que o laço
+    de eventos continue aceitando conexões durante o forward.
+    """
+
+    def __init__(self, executar, device='cpu', channels_last=False, max_lote=16,
+                 max_espera_ms=5.0, estatisticas=None):
+        """
+        Args:
+            executar: Objeto chamável que executa o forward (ver preparar_modelo)
+            device: Dispositivo do modelo
+            channels_last: Se o modelo foi preparado com channels_last
+            max_lote: Número máximo de imagens por lote
+            max_espera_ms: Tempo máximo que o primeiro pedido espera o lote encher
+            estatisticas: EstatisticasServidor onde os tamanhos de lote são registrados
+        """
+        self.executar = executar
+        self.device = device
+        self.channels_last = channels_last
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self.estatisticas = estatisticas
+        self.fila = asyncio.Queue()
+        # Uma thread: os lotes são executados um de cada vez, na ordem
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='modelo')
+        self.tarefa = None
+
+    def iniciar(self):
+        """Inicia a tarefa que monta e executa os lotes (dentro do laço de eventos)."""
+        self.tarefa = asyncio.get_running_loop().create_task(self._processar())
+
+    async def fechar(self):
+        """Cancela a tarefa dos lotes e encerra a thread do modelo."""
+        if self.tarefa is not None:
+            self.tarefa.cancel()
+            try:
+                await self.tarefa
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=True)
+
+    async def classificar(self, tensor):
+        """
+        Enfileira uma imagem e espera as probabilidades das classes.
+
+        Args:
+            tensor: Imagem preprocessada com shape [1, 3, altura, largura]
+
+        Returns:
+            Tensor com as probabilidades de cada classe
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        await self.fila.put((tensor, futuro))
+        return await futuro
+
+    def _forward(self, tensores):
+        """Executa um lote no modelo (chamado na thread do modelo)."""
+        entradas = converter_entrada(torch.cat(tensores).to(self.device), self.channels_last)
+        with torch.no_grad():
+            return torch.softmax(self.executar(entradas), dim=1).cpu()
+
+    async def _processar(self):
+        """Laço que monta os micro-lotes a partir da fila."""
+        loop = asyncio.get_running_loop()
+        while True:
+            pedidos = [await self.fila.get()]
+            limite = loop.time() + self.max_espera
+            while len(pedidos) < self.max_lote:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    pedidos.append(await asyncio.wait_for(self.fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            if self.estatisticas is not None:
+                self.estatisticas.registrar_lote(len(pedidos))
+            try:
+                probabilidades = await loop.run_in_executor(
+                    self.executor, self._forward, [tensor for tensor, _ in pedidos])
+            except Exception as e:
+                for _, futuro in pedidos:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+            for (_, futuro), prob in zip(pedidos, probabilidades):
+                if not futuro.done():
+                    futuro.set_result(prob)
+
+
+def extrair_imagem(corpo, tipo_conteudo):
+    """
+    Retorna os bytes da imagem de um corpo de requisição.
+
+    Args:
+        corpo: Bytes recebidos
+        tipo_conteudo: Cabeçalho Content-Type (multipart/form-data usa a primeira parte
+                       com arquivo; os demais tipos são tratados como a própria imagem)
+
+    Returns:
+        bytes: Conteúdo da imagem, ou None se o multipart não tiver arquivo
+    """
+    if not tipo_conteudo.startswith('multipart/form-data'):
+        return corpo
+    mensagem = BytesParser(policy=HTTP).parsebytes(
+        f'Content-Type: {tipo_conteudo}\r\n\r\n'.encode('latin-1') + corpo)
+    for parte in mensagem.iter_parts():
+        if parte.get_filename() is not None or parte.get_content_maintype() == 'image':
+            return parte.get_payload(decode=True)
+    return None
+
+
+class ServidorInferencia:
+    """Servidor HTTP/1.1 mínimo sobre asyncio que atende as rotas de classificação."""
+
+    def __init__(self, loteador, classes, estatisticas, top_k=5, executor_decodificacao=None):
+        """
+        Args:
+            loteador: LoteadorDinamico que executa o modelo
+            classes: Lista com os nomes das classes
+            estatisticas: EstatisticasServidor compartilhado com o loteador
+            top_k: Número padrão de classes por resposta
+            executor_decodificacao: Executor onde as imagens são decodificadas (None usa
+                                    o executor padrão do laço de eventos)
+        """
+        self.loteador = loteador
+        self.classes = classes
+        self.estatisticas = estatisticas
+        self.top_k = top_k
+        self.executor_decodificacao = executor_decodificacao
+
+    async def atender(self, reader, writer):
+        """Atende uma conexão, com suporte a keep-alive."""
+        try:
+            while True:
+                try:
+                    cabecalho = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                linhas = cabecalho.decode('latin-1').split('\r\n')
+                try:
+                    metodo, alvo, versao = linhas[0].split(' ', 2)
+                except ValueError:
+                    await self._responder(writer, 400, {'erro': 'Linha de requisição inválida'}, False)
+                    break
+                cabecalhos = {}
+                for linha in linhas[1:]:
+                    if ':' in linha:
+                        nome, valor = linha.split(':', 1)
+                        cabecalhos[nome.strip().lower()] = valor.strip()
+                manter = (cabecalhos.get('connection', '').lower() != 'close'
+                          and versao.strip() == 'HTTP/1.1')
+
+                if 'transfer-encoding' in cabecalhos:
+                    # Corpo em partes (chunked) não é suportado; sem ler o corpo, a conexão
+                    # não pode continuar, senão as partes seriam lidas como outra requisição
+                    await self._responder(writer, 411, {'erro': 'Envie o corpo com Content-Length'}, False)
+                    break
+                try:
+                    tamanho = int(cabecalhos.get('content-length', 0) or 0)
+                except ValueError:
+                    tamanho = -1
+                if tamanho < 0:
+                    await self._responder(writer, 400, {'erro': 'Content-Length inválido'}, False)
+                    break
+                if tamanho > TAMANHO_MAXIMO_CORPO:
+                    await self._responder(writer, 413, {'erro': 'Imagem muito grande'}, False)
+                    break
+                try:
+                    corpo = await reader.readexactly(tamanho) if tamanho else b''
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    # Cliente desconectou no meio do envio
+                    break
+
+                status, resposta = await self._rotear(metodo, alvo, cabecalhos, corpo)
+                await self._responder(writer, status, resposta, manter)
+                if not manter:
+                    break
+        except ConnectionError:
+            # Cliente desconectou antes de receber a resposta
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _rotear(self, metodo, alvo, cabecalhos, corpo):
+        """Executa a rota pedida e retorna (status HTTP, dicionário da resposta)."""
+        url = urlsplit(alvo)
+        if url.path == '/saude':
+            return 200, {'status': 'ok'}
+        if url.path == '/metricas':
+            return 200, self.estatisticas.resumo()
+        if url.path != '/classificar':
+            return 404, {'erro': f'Rota não encontrada: {url.path}'}
+        if metodo != 'POST':
+            return 405, {'erro': 'Use POST com a imagem no corpo'}
+
+        inicio = time.perf_counter()
+        parametros = parse_qs(url.query)
+        try:
+            top_k = int(parametros.get('top_k', [self.top_k])[0])
+        except ValueError:
+            return 400, {'erro': 'top_k deve ser um número inteiro'}
+        if top_k < 1:
+            return 400, {'erro': 'top_k deve ser maior ou igual a 1'}
+        top_k = min(top_k, len(self.classes))
+
+        status, resposta = 200, None
+        try:
+            imagem = extrair_imagem(corpo, cabecalhos.get('content-type', ''))
+            tensor = None
+            if imagem:
+                loop = asyncio.get_running_loop()
+                tensor = await loop.run_in_executor(self.executor_decodificacao,
+                                                    preprocessar_imagem, BytesIO(imagem))
+            if tensor is None:
+                status, resposta = 400, {'erro': 'Não foi possível ler a imagem enviada'}
+            else:
+                probabilidades = await self.loteador.classificar(tensor)
+                prob, indices = torch.topk(probabilidades, top_k)
+                resposta = {'top': [{'classe': self.classes[i], 'probabilidade': round(p * 100, 4)}
+                                    for p, i in zip(prob.tolist(), indices.tolist())]}
+        except Exception as e:
+            status, resposta = 500, {'erro': str(e)}
+
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        self.estatisticas.registrar_requisicao(latencia_ms, erro=status != 200)
+        if status == 200:
+            resposta['latencia_ms'] = round(latencia_ms, 3)
+        return status, resposta
+
+    async def _responder(self, writer, status, resposta, manter):
+        """Escreve uma resposta JSON."""
+        corpo = json.dumps(resposta, ensure_ascii=False).encode('utf-8')
+        cabecalho = (f"HTTP/1.1 {status} {STATUS_HTTP.get(status, '')}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(corpo)}\r\n"
+                     f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n")
+        writer.write(cabecalho.encode('latin-1') + corpo)
+        await writer.drain()
+
+
+async def executar_servidor(args):
+    """Carrega o modelo, inicia o loteador e atende conexões até ser interrompido."""
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    classes = carregar_classes()
+    modelo = carregar_modelo(args.modelo, num_classes=len(classes), device=device)
+    if modelo is None:
+        return
+    if args.ajustar_threads and device == 'cpu':
+        ajustar_threads(modelo, (args.max_lote, 3, 224, 224), treino=False,
+                        channels_last=args.channels_last)
+    executar = preparar_modelo(modelo, channels_last=args.channels_last, compilar=args.compilar)
+
+    estatisticas = EstatisticasServidor()
+    loteador = LoteadorDinamico(executar, device=device, channels_last=args.channels_last,
+                                max_lote=args.max_lote, max_espera_ms=args.espera_ms,
+                                estatisticas=estatisticas)
+    loteador.iniciar()
+    executor_decodificacao = ThreadPoolExecutor(max_workers=args.threads_decodificacao,
+                                                thread_name_prefix='decodificacao')
+    servidor_http = ServidorInferencia(loteador, classes, estatisticas, top_k=args.top_k,
+                                       executor_decodificacao=executor_decodificacao)
+
+    servidor = await asyncio.start_server(servidor_http.atender, args.host, args.porta)
+    print(f"✓ Servidor de inferência em http://{args.host}:{args.porta} "
+          f"(dispositivo: {device}, lote máximo: {args.max_lote}, espera máxima: {args.espera_ms} ms)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        await loteador.fechar()
+        executor_decodificacao.shutdown(wait=False)
+
+
+def main():
+    """Lê as opções da linha de comando e executa o servidor."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__.split('\n\n', 1)[1])
+    parser.add_argument('modelo', nargs='?', default='modelo_final_culturas.pth',
+                        help='Caminho do modelo (padrão: modelo_final_culturas.pth)')
+    parser.add_argument('--host', default='127.0.0.1', help='Endereço de escuta (padrão: 127.0.0.1)')
+    parser.add_argument('--porta', type=int, default=8000, help='Porta de escuta (padrão: 8000)')
+    parser.add_argument('--max-lote', type=int, default=16,
+                        help='Máximo de imagens por lote do modelo (padrão: 16)')
+    parser.add_argument('--espera-ms', type=float, default=5.0,
+                        help='Espera máxima para o lote encher, em ms (padrão: 5)')
+    parser.add_argument('--top-k', type=int, default=5, help='Classes por resposta (padrão: 5)')
+    parser.add_argument('--threads-decodificacao', type=int, default=4,
+                        help='Threads que decodificam as imagens recebidas (padrão: 4)')
+    parser.add_argument('--channels-last', action='store_true',
+                        help='Usa o formato de memória channels_last')
+    parser.add_argument('--compilar', action='store_true',
+                        help='Compila o modelo com torch.compile')
+    parser.add_argument('--ajustar-threads', action='store_true',
+                        help='Mede e aplica o número de threads de cálculo mais rápido na CPU')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(executar_servidor(args))
+    except KeyboardInterrupt:
+        print("\nServidor encerrado.")
+
+
+if __name__ == "__main__":
+    main()
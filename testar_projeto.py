@@ -90,8 +90,7 @@ def testar_dependencias():
         'torch': 'PyTorch',
         'torchvision': 'TorchVision',
         'PIL': 'Pillow',
-        'numpy': 'NumPy',
-        'sklearn': 'scikit-learn'
+        'numpy': 'NumPy'
     }
     
     todas_ok = True
@@ -1,12 +1,48 @@
 """
 Módulo contendo a função de treinamento da rede neural.
 """
+import sys
 import time
 import torch
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, IterableDataset
+from preparacao_modelo import preparar_modelo, converter_entrada
+from checkpoint import EscritorCheckpoint, capturar_estado_rng, restaurar_estado_rng
+from metricas import AcumuladorMetricas
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
-def treinar_rede(cnn, dataset, epochs=10, learning_rate=0.000001, batch_size=64, device=None):
+
+def memoria_pico_mb(device='cpu'):
+    """
+    Retorna o pico de memória do processo desde o seu início.
+    
+    Args:
+        device: Dispositivo do treino; em 'cuda' retorna o pico de memória alocada na GPU
+        
+    Returns:
+        float: Pico em MB, ou None se não for possível medir nesta plataforma
+    """
+    if str(device).startswith('cuda'):
+        return torch.cuda.max_memory_allocated(device) / 2**20
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é dado em KB no Linux e em bytes no macOS
+        return pico / 2**20 if sys.platform == 'darwin' else pico / 2**10
+    try:
+        import psutil
+        memoria = psutil.Process().memory_info()
+        # No Windows peak_wset é o pico do conjunto de trabalho; nos demais, o RSS atual
+        return getattr(memoria, 'peak_wset', memoria.rss) / 2**20
+    except ImportError:
+        return None
+
+
+def treinar_rede(cnn, dataset, epochs=10, learning_rate=0.000001, batch_size=64, device=None,
+                 num_workers=0, channels_last=False, compilar=False, caminho_checkpoint=None,
+                 intervalo_checkpoint=10, checkpoint=None, metadados=None, passos_acumulacao=1):
     """
     Treina a rede neural convolucional.
     
@@ -17,6 +53,16 @@ def treinar_rede(cnn, dataset, epochs=10, learning_rate=0.000001, batch_size=64,
         learning_rate: Taxa de aprendizado
         batch_size: Tamanho do lote
         device: Dispositivo ('cpu' ou 'cuda'). Se None, detecta automaticamente.
+        num_workers: Processos do DataLoader (no modo streaming, dividem os arquivos entre si)
+        channels_last: Se True, usa o formato de memória channels_last no modelo e nas entradas
+        compilar: Se True, compila o modelo com torch.compile (volta ao modo eager se falhar)
+        caminho_checkpoint: Arquivo para o estado completo do treino (None desativa)
+        intervalo_checkpoint: A cada quantas épocas o estado completo é gravado
+        checkpoint: Estado carregado com checkpoint.carregar_checkpoint para continuar
+                    um treino interrompido (None começa do início)
+        metadados: Dicionário gravado junto com o estado (ex.: semente da divisão dos dados)
+        passos_acumulacao: Lotes cujos gradientes são somados antes de cada passo do
+                           otimizador (lote efetivo = batch_size * passos_acumulacao)
         
     Returns:
         Modelo treinado
@@ -25,32 +71,76 @@ def treinar_rede(cnn, dataset, epochs=10, learning_rate=0.000001, batch_size=64,
         device = 'cuda' if torch.cuda.is_available() else 'cpu'
     
     cnn = cnn.to(device)
+    executar = preparar_modelo(cnn, channels_last=channels_last, compilar=compilar)
     otimizador = torch.optim.Adam(cnn.parameters(), lr=learning_rate)
-    train_loader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+    # O modelo retorna logits; a sigmoid fica dentro da perda (numericamente estável)
+    criterio = torch.nn.BCEWithLogitsLoss()
+    # Datasets em streaming já embaralham internamente e não aceitam shuffle no DataLoader
+    streaming = isinstance(dataset, IterableDataset)
+    train_loader = DataLoader(dataset, batch_size=batch_size, shuffle=not streaming,
+                              num_workers=num_workers)
+    
+    epoca_inicial = 0
+    if checkpoint is not None:
+        cnn.load_state_dict(checkpoint['modelo'])
+        otimizador.load_state_dict(checkpoint['otimizador'])
+        epoca_inicial = checkpoint['epoca']
+        restaurar_estado_rng(checkpoint['rng'])
+        print(f"✓ Treino retomado a partir da época {epoca_inicial + 1}\n")
+    
+    escritor = EscritorCheckpoint()
+    metricas = AcumuladorMetricas(device=device)
     
-    for epoch in range(epochs):
-        perda_total = 0
+    for epoch in range(epoca_inicial, epochs):
+        metricas.reiniciar()
         inicio_tempo = time.time()
-        otimizador.zero_grad()
+        otimizador.zero_grad(set_to_none=True)
+        lotes_acumulados = 0
         
         for inputs, targets in train_loader:
             # Mover dados para o dispositivo apropriado
-            inputs = inputs.to(device)
+            inputs = converter_entrada(inputs.to(device), channels_last)
             targets = targets.to(device)
             
-            x_hat = cnn(inputs)
-            loss = ((targets - x_hat) ** 2).sum()
+            logits = executar(inputs)
+            loss = criterio(logits, targets)
             
-            loss.backward(retain_graph=True)
-            perda_total += loss.item()
+            # O grafo é liberado pelo backward; a perda é dividida para que os gradientes
+            # acumulados correspondam à média do lote efetivo
+            (loss / passos_acumulacao).backward()
+            # logit > 0 equivale a probabilidade > 0.5
+            metricas.atualizar(logits.detach() > 0, targets, loss)
             
+            lotes_acumulados += 1
+            if lotes_acumulados == passos_acumulacao:
+                otimizador.step()
+                otimizador.zero_grad(set_to_none=True)
+                lotes_acumulados = 0
+        
+        # Lotes que sobraram no fim da época também atualizam os pesos
+        if lotes_acumulados:
             otimizador.step()
-            otimizador.zero_grad()
+            otimizador.zero_grad(set_to_none=True)
         
         fim_tempo = time.time()
-        perda_media = perda_total / len(dataset)
+        resultado = metricas.resultados()
+        perda_media = resultado['perda']
         tempo_epoch = fim_tempo - inicio_tempo
-        print(f"Época {epoch+1}/{epochs}: Perda Total: {perda_media:.4f}, Tempo: {tempo_epoch:.2f}s")
+        pico = memoria_pico_mb(device)
+        memoria = f", Memória de pico: {pico:.0f} MB" if pico is not None else ""
+        print(f"Época {epoch+1}/{epochs}: Perda: {perda_media:.4f}, "
+              f"Acurácia: {resultado['acuracia']:.4f}, Tempo: {tempo_epoch:.2f}s{memoria}")
+        
+        if caminho_checkpoint and ((epoch + 1) % intervalo_checkpoint == 0 or epoch + 1 == epochs):
+            escritor.salvar({
+                'epoca': epoch + 1,
+                'modelo': cnn.state_dict(),
+                'otimizador': otimizador.state_dict(),
+                'rng': capturar_estado_rng(),
+                'metadados': metadados or {}
+            }, caminho_checkpoint)
+    
+    escritor.fechar()
     
     return cnn
 
@@ -5,11 +5,95 @@ import os
 import time
 import torch
 import torch.nn as nn
-from torch.utils.data import DataLoader
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader, Subset
+from torch.utils.data.distributed import DistributedSampler
+from data_loader_crops import normalizar_lote
+from preparacao_modelo import preparar_modelo, converter_entrada
+from checkpoint import EscritorCheckpoint, capturar_estado_rng, restaurar_estado_rng, ler_info
+from metricas import AcumuladorMetricas
+
+
+# Precisões aceitas por treinar_rede e o dtype usado no autocast
+PRECISOES = {
+    'float32': None,
+    'bfloat16': torch.bfloat16,
+    'float16': torch.float16
+}
+
+# Métricas que podem ser monitoradas pela parada antecipada e pelo agendador 'plateau'
+METRICAS_MONITORADAS = ('validacao_loss', 'validacao_acc')
+AGENDADORES_LR = (None, 'plateau', 'cosseno')
+
+
+class ParadaAntecipada:
+    """
+    Interrompe o treino quando a métrica monitorada para de melhorar.
+
+    Uma época conta como melhora quando a métrica supera o melhor valor anterior
+    por mais de min_delta (para baixo na loss, para cima na acurácia).
+    """
+
+    def __init__(self, monitorar='validacao_loss', paciencia=10, min_delta=0.0):
+        """
+        Args:
+            monitorar: 'validacao_loss' ou 'validacao_acc'
+            paciencia: Épocas seguidas sem melhora antes de parar
+            min_delta: Variação mínima para considerar uma melhora
+        """
+        self.monitorar = monitorar
+        self.paciencia = paciencia
+        self.min_delta = min_delta
+        self.minimizar = monitorar.endswith('loss')
+        self.melhor = None
+        self.melhor_epoca = 0
+        self.epocas_sem_melhora = 0
+
+    def atualizar(self, valor, epoca):
+        """
+        Registra o valor da métrica em uma época.
+
+        Args:
+            valor: Valor da métrica monitorada
+            epoca: Número da época (a partir de 1)
+
+        Returns:
+            bool: True se o treino deve parar
+        """
+        if self.melhor is None:
+            melhorou = True
+        elif self.minimizar:
+            melhorou = valor < self.melhor - self.min_delta
+        else:
+            melhorou = valor > self.melhor + self.min_delta
+
+        if melhorou:
+            self.melhor = valor
+            self.melhor_epoca = epoca
+            self.epocas_sem_melhora = 0
+        else:
+            self.epocas_sem_melhora += 1
+
+        return self.epocas_sem_melhora >= self.paciencia
+
+    def state_dict(self):
+        return {'melhor': self.melhor, 'melhor_epoca': self.melhor_epoca,
+                'epocas_sem_melhora': self.epocas_sem_melhora}
+
+    def load_state_dict(self, estado):
+        self.melhor = estado['melhor']
+        self.melhor_epoca = estado['melhor_epoca']
+        self.epocas_sem_melhora = estado['epocas_sem_melhora']
 
 
 def treinar_rede(modelo, dataset_treino, dataset_validacao, epochs=50, 
-                 learning_rate=0.001, batch_size=32, device='cpu'):
+                 learning_rate=0.001, batch_size=32, device='cpu', num_workers=0,
+                 aumentacao=None, precisao='float32', channels_last=False, compilar=False,
+                 caminho_checkpoint=None, intervalo_checkpoint=10, checkpoint=None, metadados=None,
+                 monitorar='validacao_loss', paciencia=None, min_delta=0.0,
+                 agendador_lr=None, paciencia_lr=5, fator_lr=0.1,
+                 caminho_melhor_modelo='melhor_modelo_culturas.pth'):
     """
     Treina a rede neural convolucional com validação.
     
@@ -19,35 +103,159 @@ def treinar_rede(modelo, dataset_treino, dataset_validacao, epochs=50,
         dataset_validacao: Dataset de validação
         epochs: Número de épocas de treinamento
         learning_rate: Taxa de aprendizado
-        batch_size: Tamanho do lote
+        batch_size: Tamanho do lote (no modo distribuído, o lote somado de todos os processos)
         device: Dispositivo ('cpu' ou 'cuda')
+        num_workers: Processos do DataLoader (úteis quando as imagens são decodificadas
+                     sob demanda, como no CropDataset)
+        aumentacao: AumentacaoLote aplicada aos lotes de treino já no dispositivo
+                    (None apenas normaliza os lotes)
+        precisao: 'float32', 'bfloat16' ou 'float16'. As duas últimas executam o forward
+                  e a loss em autocast; os pesos e o otimizador continuam em float32
+        channels_last: Se True, usa o formato de memória channels_last no modelo e nas entradas
+        compilar: Se True, compila o modelo com torch.compile (volta ao modo eager se falhar)
+        caminho_checkpoint: Arquivo para o estado completo do treino (None desativa)
+        intervalo_checkpoint: A cada quantas épocas o estado completo é gravado
+                              (a última época sempre é gravada)
+        checkpoint: Estado carregado com checkpoint.carregar_checkpoint para continuar
+                    um treino interrompido (None começa do início)
+        metadados: Dicionário gravado junto com o estado (ex.: semente da divisão dos dados)
+        monitorar: Métrica usada pela parada antecipada e pelo agendador 'plateau'
+                   ('validacao_loss' ou 'validacao_acc')
+        paciencia: Épocas sem melhora antes de parar o treino (None desativa a parada antecipada)
+        min_delta: Melhora mínima da métrica monitorada
+        agendador_lr: None (taxa fixa), 'plateau' (reduz a taxa quando a métrica estagna)
+                      ou 'cosseno' (decaimento em cosseno até o fim das épocas)
+        paciencia_lr: Épocas sem melhora antes de reduzir a taxa (agendador 'plateau')
+        fator_lr: Fator multiplicado na taxa a cada redução (agendador 'plateau')
+        caminho_melhor_modelo: Arquivo onde os pesos da melhor época são gravados (a
+                               acurácia e a época ficam em um JSON ao lado, ver
+                               checkpoint.caminho_info)
         
     Returns:
         Modelo treinado e histórico de métricas
+    
+    Se for chamada dentro de um grupo torch.distributed já iniciado (ver
+    treino_distribuido.py), cada processo treina uma fatia dos dados, os gradientes
+    são somados entre os processos e apenas o processo 0 imprime e grava arquivos.
     """
+    if precisao not in PRECISOES:
+        raise ValueError(f"precisao deve ser uma de {list(PRECISOES)}, recebido '{precisao}'")
+    if monitorar not in METRICAS_MONITORADAS:
+        raise ValueError(f"monitorar deve ser uma de {list(METRICAS_MONITORADAS)}, recebido '{monitorar}'")
+    if agendador_lr not in AGENDADORES_LR:
+        raise ValueError(f"agendador_lr deve ser um de {list(AGENDADORES_LR)}, recebido '{agendador_lr}'")
+    
+    tipo_device = torch.device(device).type
+    dtype_autocast = PRECISOES[precisao]
+    usar_autocast = dtype_autocast is not None
+    # float16 tem faixa dinâmica pequena e precisa de escala de gradientes;
+    # bfloat16 tem a mesma faixa do float32 e dispensa a escala
+    escalador = torch.amp.GradScaler(tipo_device, enabled=precisao == 'float16')
+    
+    distribuido = dist.is_available() and dist.is_initialized()
+    rank = dist.get_rank() if distribuido else 0
+    processos = dist.get_world_size() if distribuido else 1
+    principal = rank == 0
+    
     modelo = modelo.to(device)
+    # O forward passa por 'executar'; o modelo original continua sendo usado para
+    # parâmetros, train()/eval() e state_dict()
+    if distribuido:
+        # O DDP faz o all-reduce dos gradientes no backward. A validação usa o modelo
+        # original, sem comunicação entre os processos
+        preparar_modelo(modelo, channels_last=channels_last)
+        executar = preparar_modelo(DistributedDataParallel(modelo), compilar=compilar)
+        executar_validacao = modelo
+    else:
+        executar = preparar_modelo(modelo, channels_last=channels_last, compilar=compilar)
+        executar_validacao = executar
     criterio = nn.CrossEntropyLoss()
     otimizador = torch.optim.Adam(modelo.parameters(), lr=learning_rate)
     
-    train_loader = DataLoader(dataset_treino, batch_size=batch_size, shuffle=True)
-    val_loader = DataLoader(dataset_validacao, batch_size=batch_size, shuffle=False)
+    agendador = None
+    if agendador_lr == 'plateau':
+        agendador = torch.optim.lr_scheduler.ReduceLROnPlateau(
+            otimizador, mode='min' if monitorar.endswith('loss') else 'max',
+            factor=fator_lr, patience=paciencia_lr, threshold=min_delta, threshold_mode='abs'
+        )
+    elif agendador_lr == 'cosseno':
+        agendador = torch.optim.lr_scheduler.CosineAnnealingLR(otimizador, T_max=epochs)
+    
+    parada = ParadaAntecipada(monitorar, paciencia, min_delta) if paciencia is not None else None
+    
+    # Métricas acumuladas no dispositivo e lidas uma única vez por época
+    metricas_treino = AcumuladorMetricas(device=device)
+    metricas_validacao = AcumuladorMetricas(device=device)
+    
+    amostrador_treino = None
+    if distribuido:
+        # Cada processo recebe uma fatia diferente dos dados a cada época
+        amostrador_treino = DistributedSampler(dataset_treino, num_replicas=processos, rank=rank, shuffle=True)
+        dataset_validacao = Subset(dataset_validacao, range(rank, len(dataset_validacao), processos))
+        batch_size = max(1, batch_size // processos)
+    
+    train_loader = DataLoader(dataset_treino, batch_size=batch_size, shuffle=amostrador_treino is None,
+                              sampler=amostrador_treino,
+                              num_workers=num_workers, persistent_workers=num_workers > 0)
+    val_loader = DataLoader(dataset_validacao, batch_size=batch_size, shuffle=False,
+                            num_workers=num_workers, persistent_workers=num_workers > 0)
     
     historico = {
         'treino_loss': [],
         'treino_acc': [],
         'validacao_loss': [],
-        'validacao_acc': []
+        'validacao_acc': [],
+        'tempo_epoch': [],
+        'lr': []
     }
     
     melhor_acc_validacao = 0.0
-    caminho_melhor_modelo = 'melhor_modelo_culturas.pth'
+    epoca_inicial = 0
+    # Grava o melhor modelo em segundo plano para não parar o treino esperando o disco
+    escritor = EscritorCheckpoint()
+    
+    if checkpoint is not None:
+        modelo.load_state_dict(checkpoint['modelo'])
+        otimizador.load_state_dict(checkpoint['otimizador'])
+        escalador.load_state_dict(checkpoint['escalador'])
+        historico = checkpoint['historico']
+        historico.setdefault('lr', [])
+        melhor_acc_validacao = checkpoint['melhor_acc_validacao']
+        caminho_melhor_modelo = checkpoint['caminho_melhor_modelo']
+        epoca_inicial = checkpoint['epoca']
+        # O melhor modelo pode ter sido gravado depois do último checkpoint completo;
+        # sem isso uma época pior que ele sobrescreveria o arquivo após a retomada
+        info_melhor = ler_info(caminho_melhor_modelo)
+        if info_melhor is not None and os.path.exists(caminho_melhor_modelo):
+            melhor_acc_validacao = max(melhor_acc_validacao, info_melhor['acuracia_validacao'])
+        if agendador is not None and checkpoint.get('agendador') is not None:
+            agendador.load_state_dict(checkpoint['agendador'])
+        if parada is not None and checkpoint.get('parada_antecipada') is not None:
+            parada.load_state_dict(checkpoint['parada_antecipada'])
+        if historico.get('parada', {}).get('motivo') == 'parada_antecipada':
+            # O treino interrompido já tinha terminado por parada antecipada
+            epoca_inicial = epochs
+        # Mesmos geradores aleatórios do ponto de parada: o embaralhamento, o dropout
+        # e a aumentação continuam exatamente como no treino original. No modo
+        # distribuído o checkpoint guarda uma lista com o estado de cada processo
+        estado_rng = checkpoint['rng']
+        if isinstance(estado_rng, list):
+            estado_rng = estado_rng[rank] if rank < len(estado_rng) else estado_rng[0]
+        restaurar_estado_rng(estado_rng)
+        if principal and epoca_inicial >= epochs:
+            print(f"✓ O treino do checkpoint já havia terminado na época {checkpoint['epoca']}\n")
+        elif principal:
+            print(f"✓ Treino retomado a partir da época {epoca_inicial + 1} "
+                  f"(melhor acurácia de validação até aqui: {melhor_acc_validacao:.2f}%)\n")
     
-    for epoch in range(epochs):
+    for epoch in range(epoca_inicial, epochs):
         # Fase de treinamento
         modelo.train()
-        perda_treino = 0.0
-        corretos_treino = 0
-        total_treino = 0
+        metricas_treino.reiniciar()
+        if amostrador_treino is not None:
+            amostrador_treino.set_epoch(epoch)
+        
+        tempo_aumentacao = 0.0
         
         inicio_tempo = time.time()
         
@@ -55,41 +263,56 @@ def treinar_rede(modelo, dataset_treino, dataset_validacao, epochs=50,
             inputs = inputs.to(device)
             targets = targets.to(device)
             
+            if aumentacao is not None:
+                # Aumentação do lote inteiro de uma vez; com mixup/cutmix os alvos
+                # passam a ser probabilidades e a acurácia usa os rótulos originais
+                inicio_aumentacao = time.time()
+                inputs, alvos = aumentacao(inputs, targets)
+                if inputs.is_cuda:
+                    torch.cuda.synchronize()
+                tempo_aumentacao += time.time() - inicio_aumentacao
+            else:
+                # Lotes armazenados em uint8 são convertidos e normalizados já no dispositivo
+                inputs = normalizar_lote(inputs)
+                alvos = targets
+            inputs = converter_entrada(inputs, channels_last)
+            
             otimizador.zero_grad()
-            outputs = modelo(inputs)
-            loss = criterio(outputs, targets)
-            loss.backward()
-            otimizador.step()
+            with torch.autocast(device_type=tipo_device, dtype=dtype_autocast, enabled=usar_autocast):
+                outputs = executar(inputs)
+                loss = criterio(outputs, alvos)
+            escalador.scale(loss).backward()
+            escalador.step(otimizador)
+            escalador.update()
             
-            perda_treino += loss.item()
-            _, preditos = torch.max(outputs.data, 1)
-            total_treino += targets.size(0)
-            corretos_treino += (preditos == targets).sum().item()
+            metricas_treino.atualizar(outputs.detach().argmax(1), targets, loss)
         
         # Fase de validação
         modelo.eval()
-        perda_validacao = 0.0
-        corretos_validacao = 0
-        total_validacao = 0
+        metricas_validacao.reiniciar()
         
         with torch.no_grad():
             for inputs, targets in val_loader:
-                inputs = inputs.to(device)
+                inputs = converter_entrada(normalizar_lote(inputs.to(device)), channels_last)
                 targets = targets.to(device)
                 
-                outputs = modelo(inputs)
-                loss = criterio(outputs, targets)
+                with torch.autocast(device_type=tipo_device, dtype=dtype_autocast, enabled=usar_autocast):
+                    outputs = executar_validacao(inputs)
+                    loss = criterio(outputs, targets)
                 
-                perda_validacao += loss.item()
-                _, preditos = torch.max(outputs.data, 1)
-                total_validacao += targets.size(0)
-                corretos_validacao += (preditos == targets).sum().item()
+                metricas_validacao.atualizar(outputs.argmax(1), targets, loss)
         
-        # Calcular métricas
-        acc_treino = 100 * corretos_treino / total_treino
-        acc_validacao = 100 * corretos_validacao / total_validacao
-        perda_media_treino = perda_treino / len(train_loader)
-        perda_media_validacao = perda_validacao / len(val_loader)
+        # Calcular métricas (única sincronização com o dispositivo na época)
+        if distribuido:
+            metricas_treino.sincronizar()
+            metricas_validacao.sincronizar()
+        resultado_treino = metricas_treino.resultados()
+        resultado_validacao = metricas_validacao.resultados()
+        total_treino = resultado_treino['amostras']
+        acc_treino = 100 * resultado_treino['acuracia']
+        acc_validacao = 100 * resultado_validacao['acuracia']
+        perda_media_treino = resultado_treino['perda']
+        perda_media_validacao = resultado_validacao['perda']
         
         historico['treino_loss'].append(perda_media_treino)
         historico['treino_acc'].append(acc_treino)
@@ -98,53 +321,133 @@ def treinar_rede(modelo, dataset_treino, dataset_validacao, epochs=50,
         
         fim_tempo = time.time()
         tempo_epoch = fim_tempo - inicio_tempo
+        historico['tempo_epoch'].append(tempo_epoch)
+        historico['lr'].append(otimizador.param_groups[0]['lr'])
+        
+        # Agendador da taxa de aprendizado e parada antecipada
+        valor_monitorado = perda_media_validacao if monitorar == 'validacao_loss' else acc_validacao
+        if agendador_lr == 'plateau':
+            agendador.step(valor_monitorado)
+        elif agendador is not None:
+            agendador.step()
         
-        # Salvar melhor modelo
+        parar = parada is not None and parada.atualizar(valor_monitorado, epoch + 1)
+        if parar or epoch + 1 == epochs:
+            epocas_restantes = epochs - (epoch + 1)
+            tempos = historico['tempo_epoch']
+            historico['parada'] = {
+                'motivo': 'parada_antecipada' if parar and epocas_restantes > 0 else 'epocas_completas',
+                'epoca': epoch + 1,
+                'epocas_configuradas': epochs,
+                'melhor_epoca': parada.melhor_epoca if parada is not None else None,
+                'monitorar': monitorar,
+                # Estimativa do tempo que as épocas restantes teriam levado
+                'tempo_economizado_s': epocas_restantes * sum(tempos) / len(tempos)
+            }
+        
+        # Salvar melhor modelo (a cópia do estado é feita agora, a escrita em disco depois)
         if acc_validacao > melhor_acc_validacao:
             melhor_acc_validacao = acc_validacao
-            try:
-                # Tentar salvar usando nome temporário primeiro
-                caminho_temp = caminho_melhor_modelo + '.tmp'
-                torch.save(modelo.state_dict(), caminho_temp)
-                
-                # Se sucesso, substituir arquivo antigo
-                if os.path.exists(caminho_melhor_modelo):
-                    os.remove(caminho_melhor_modelo)
-                os.rename(caminho_temp, caminho_melhor_modelo)
-                
-            except Exception as e:
-                print(f"⚠️  Aviso: Não foi possível salvar o melhor modelo: {e}")
-                print(f"   Tentando salvar com nome alternativo...")
-                try:
-                    # Tentar com nome alternativo
-                    caminho_alternativo = f'melhor_modelo_culturas_ep{epoch+1}.pth'
-                    torch.save(modelo.state_dict(), caminho_alternativo)
-                    caminho_melhor_modelo = caminho_alternativo
-                    print(f"   ✓ Modelo salvo em '{caminho_alternativo}'")
-                except Exception as e2:
-                    print(f"   ❌ Erro ao salvar modelo alternativo: {e2}")
+            if principal:
+                escritor.salvar(
+                    modelo.state_dict(),
+                    caminho_melhor_modelo,
+                    caminho_alternativo=f'{os.path.splitext(caminho_melhor_modelo)[0]}_ep{epoch+1}.pth',
+                    info={'acuracia_validacao': acc_validacao, 'epoca': epoch + 1}
+                )
+        
+        # Salvar o estado completo do treino para poder retomá-lo
+        if caminho_checkpoint and ((epoch + 1) % intervalo_checkpoint == 0 or epoch + 1 == epochs or parar):
+            estado_rng = capturar_estado_rng()
+            if distribuido:
+                # Todos os processos participam; o processo 0 grava o estado de cada um
+                estados_rng = [None] * processos
+                dist.all_gather_object(estados_rng, estado_rng)
+                estado_rng = estados_rng
+            if principal:
+                escritor.salvar({
+                    'epoca': epoch + 1,
+                    'modelo': modelo.state_dict(),
+                    'otimizador': otimizador.state_dict(),
+                    'escalador': escalador.state_dict(),
+                    'historico': historico,
+                    'melhor_acc_validacao': melhor_acc_validacao,
+                    'caminho_melhor_modelo': caminho_melhor_modelo,
+                    'rng': estado_rng,
+                    'agendador': agendador.state_dict() if agendador is not None else None,
+                    'parada_antecipada': parada.state_dict() if parada is not None else None,
+                    'metadados': metadados or {}
+                }, caminho_checkpoint)
+        
+        if principal:
+            print(f"Época {epoch+1}/{epochs}:")
+            print(f"  Treino - Loss: {perda_media_treino:.4f}, Acc: {acc_treino:.2f}%")
+            print(f"  Validação - Loss: {perda_media_validacao:.4f}, Acc: {acc_validacao:.2f}%")
+            if aumentacao is not None and tempo_aumentacao > 0:
+                print(f"  Tempo: {tempo_epoch:.2f}s (aumentação: {tempo_aumentacao:.2f}s, "
+                      f"{total_treino / tempo_aumentacao:.0f} imagens/s)")
+            else:
+                print(f"  Tempo: {tempo_epoch:.2f}s")
+            print()
         
-        print(f"Época {epoch+1}/{epochs}:")
-        print(f"  Treino - Loss: {perda_media_treino:.4f}, Acc: {acc_treino:.2f}%")
-        print(f"  Validação - Loss: {perda_media_validacao:.4f}, Acc: {acc_validacao:.2f}%")
-        print(f"  Tempo: {tempo_epoch:.2f}s")
-        print()
+        if parar and epoch + 1 < epochs:
+            if principal:
+                info = historico['parada']
+                print(f"⏹️  Parada antecipada na época {epoch+1}: '{monitorar}' sem melhora há "
+                      f"{parada.epocas_sem_melhora} épocas (melhor na época {parada.melhor_epoca})")
+                print(f"   Épocas evitadas: {epochs - (epoch + 1)}, "
+                      f"tempo economizado estimado: {info['tempo_economizado_s'] / 60:.1f} min\n")
+            break
     
-    # Carregar melhor modelo
+    # Carregar melhor modelo, depois de terminar qualquer gravação pendente
+    escritor.fechar()
+    if distribuido:
+        # Os demais processos esperam o processo 0 terminar de gravar o arquivo
+        dist.barrier()
+    caminho_melhor_modelo = escritor.ultimos_caminhos.get(caminho_melhor_modelo, caminho_melhor_modelo)
     if os.path.exists(caminho_melhor_modelo):
         try:
             modelo.load_state_dict(torch.load(caminho_melhor_modelo, map_location=device))
-            print(f"✓ Melhor modelo carregado de '{caminho_melhor_modelo}'")
+            if principal:
+                print(f"✓ Melhor modelo carregado de '{caminho_melhor_modelo}'")
         except Exception as e:
             print(f"⚠️  Aviso: Não foi possível carregar o melhor modelo: {e}")
             print("   Usando modelo da última época...")
-    else:
+    elif principal:
         print("⚠️  Aviso: Arquivo do melhor modelo não encontrado. Usando modelo da última época...")
     
-    print(f"Melhor acurácia de validação: {melhor_acc_validacao:.2f}%")
+    if principal:
+        print(f"Melhor acurácia de validação: {melhor_acc_validacao:.2f}%")
     
     # Adicionar melhor acurácia ao histórico
     historico['melhor_acc_validacao'] = melhor_acc_validacao
     
     return modelo, historico
 
+
+def imprimir_comparacao_precisao(historico_referencia, historico, precisao):
+    """
+    Imprime, época a época, o tempo e a acurácia de validação de um treino em
+    precisão reduzida ao lado de um treino de referência em float32.
+    
+    Args:
+        historico_referencia: Histórico retornado por treinar_rede com precisao='float32'
+        historico: Histórico retornado por treinar_rede com a precisão reduzida
+        precisao: Nome da precisão reduzida (para o cabeçalho)
+    """
+    print(f"{'Época':>6} {'Tempo float32':>14} {f'Tempo {precisao}':>15} {'Ganho':>7} "
+          f"{'Acc float32':>12} {f'Acc {precisao}':>13}")
+    print("-" * 72)
+    epocas = min(len(historico_referencia['tempo_epoch']), len(historico['tempo_epoch']))
+    for i in range(epocas):
+        tempo_ref = historico_referencia['tempo_epoch'][i]
+        tempo = historico['tempo_epoch'][i]
+        print(f"{i+1:>6} {tempo_ref:>13.2f}s {tempo:>14.2f}s {tempo_ref / tempo:>6.2f}x "
+              f"{historico_referencia['validacao_acc'][i]:>11.2f}% {historico['validacao_acc'][i]:>12.2f}%")
+    
+    tempo_total_ref = sum(historico_referencia['tempo_epoch'][:epocas])
+    tempo_total = sum(historico['tempo_epoch'][:epocas])
+    print("-" * 72)
+    print(f"{'Total':>6} {tempo_total_ref:>13.2f}s {tempo_total:>14.2f}s {tempo_total_ref / tempo_total:>6.2f}x "
+          f"{historico_referencia['melhor_acc_validacao']:>11.2f}% {historico['melhor_acc_validacao']:>12.2f}%")
+    print("(linha Total: soma dos tempos e melhor acurácia de validação)")
@@ -0,0 +1,101 @@
+"""
+Módulo para treinar o modelo de culturas com vários processos na mesma máquina
+(DistributedDataParallel sobre o backend gloo, apenas CPU).
+"""
+import os
+import shutil
+import socket
+import tempfile
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from checkpoint import definir_semente
+from trainer_crops import treinar_rede
+
+
+def _porta_livre():
+    """Retorna uma porta TCP livre para o processo 0 coordenar o grupo."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _executar_processo(rank, processos, porta, threads_por_processo, semente, modelo,
+                       dataset_treino, dataset_validacao, opcoes_treino, caminho_resultado):
+    """
+    Função executada em cada processo do grupo.
+
+    Args:
+        rank: Índice do processo (passado por mp.spawn)
+        processos: Número total de processos
+        porta: Porta do processo 0
+        threads_por_processo: Threads de cálculo de cada processo
+        semente: Semente base (cada processo usa semente + rank)
+        modelo: Modelo com os pesos iniciais
+        dataset_treino: Dataset de treinamento completo
+        dataset_validacao: Dataset de validação completo
+        opcoes_treino: Argumentos repassados para treinar_rede
+        caminho_resultado: Arquivo onde o processo 0 grava o modelo final e o histórico
+    """
+    os.environ['MASTER_ADDR'] = '127.0.0.1'
+    os.environ['MASTER_PORT'] = str(porta)
+    torch.set_num_threads(threads_por_processo)
+    # Dropout e aumentação diferentes em cada processo; os pesos iniciais são os do
+    # processo 0, copiados para os demais pelo DDP
+    definir_semente(semente + rank)
+
+    dist.init_process_group('gloo', rank=rank, world_size=processos)
+    try:
+        modelo, historico = treinar_rede(modelo, dataset_treino, dataset_validacao, **opcoes_treino)
+        if rank == 0:
+            torch.save({'modelo': modelo.state_dict(), 'historico': historico}, caminho_resultado)
+    finally:
+        dist.destroy_process_group()
+
+
+def treinar_rede_distribuido(modelo, dataset_treino, dataset_validacao, num_processos=2,
+                             threads_por_processo=None, semente=0, **opcoes_treino):
+    """
+    Treina o modelo com num_processos processos locais usando DistributedDataParallel.
+
+    Cada processo recebe uma fatia dos dados (DistributedSampler), os gradientes são
+    somados entre os processos a cada lote e apenas o processo 0 imprime o progresso
+    e grava checkpoints e o melhor modelo.
+
+    Args:
+        modelo: Modelo com os pesos iniciais
+        dataset_treino: Dataset de treinamento
+        dataset_validacao: Dataset de validação
+        num_processos: Número de processos de treino
+        threads_por_processo: Threads de cálculo por processo (None divide os núcleos
+                              da máquina igualmente entre os processos)
+        semente: Semente base dos geradores aleatórios
+        **opcoes_treino: Demais argumentos de trainer_crops.treinar_rede (epochs,
+                         batch_size global, learning_rate, checkpoint, ...)
+
+    Returns:
+        Modelo treinado e histórico de métricas
+    """
+    if threads_por_processo is None:
+        threads_por_processo = max(1, (os.cpu_count() or 1) // num_processos)
+
+    # O backend gloo trabalha com tensores na CPU
+    opcoes_treino['device'] = 'cpu'
+    modelo = modelo.to('cpu')
+
+    diretorio_temp = tempfile.mkdtemp(prefix='treino_distribuido_')
+    caminho_resultado = os.path.join(diretorio_temp, 'resultado.pth')
+    try:
+        mp.spawn(
+            _executar_processo,
+            args=(num_processos, _porta_livre(), threads_por_processo, semente, modelo,
+                  dataset_treino, dataset_validacao, opcoes_treino, caminho_resultado),
+            nprocs=num_processos,
+            join=True
+        )
+        resultado = torch.load(caminho_resultado, map_location='cpu', weights_only=False)
+    finally:
+        shutil.rmtree(diretorio_temp, ignore_errors=True)
+
+    modelo.load_state_dict(resultado['modelo'])
+    return modelo, resultado['historico']
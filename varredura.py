@@ -0,0 +1,317 @@
+"""
+Script para varrer hiperparâmetros do modelo de culturas (learning_rate, batch_size e
+tamanho_imagem) com várias tentativas de treino em paralelo.
+
+O dataset é decodificado uma única vez por tamanho de imagem e colocado em memória
+compartilhada; os processos de trabalho recebem os tensores sem cópia, cada um com sua
+própria cota de threads, e ao final é gravada uma tabela com as tentativas ordenadas
+pela melhor acurácia de validação.
+
+Exemplos:
+    python varredura.py --learning-rate 0.001 0.0001 --batch-size 32 64 --paralelo 2
+    python varredura.py --spec varredura.json
+
+Formato do arquivo --spec (valores omitidos usam os da linha de comando):
+    {
+        "busca": "aleatoria",
+        "tentativas": 8,
+        "parametros": {
+            "learning_rate": {"min": 1e-5, "max": 1e-2, "log": true},
+            "batch_size": [32, 64, 128],
+            "tamanho_imagem": [128, 224]
+        },
+        "fixos": {"agendador_lr": "plateau", "paciencia": 10}
+    }
+
+Na busca em grade os parâmetros devem ser listas; na aleatória também podem ser
+intervalos {"min", "max", "log"} (inteiros se min e max forem inteiros). "fixos" são
+argumentos repassados sem alteração para trainer_crops.treinar_rede.
+"""
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import time
+import torch
+import torch.multiprocessing as mp
+from model_crops import RedeCnnCulturasAgricolas
+from data_loader_crops import preparar_datasets
+from checkpoint import definir_semente
+from trainer_crops import treinar_rede
+
+BUSCAS = ('grade', 'aleatoria')
+PARAMETROS = ('learning_rate', 'batch_size', 'tamanho_imagem')
+
+# Datasets compartilhados com cada processo de trabalho ({tamanho: (treino, validacao, classes)})
+_datasets = None
+
+
+def gerar_tentativas(espec, semente=0):
+    """
+    Gera as combinações de hiperparâmetros de uma especificação de busca.
+
+    Args:
+        espec: Dicionário com 'busca', 'parametros' e, na busca aleatória, 'tentativas'
+        semente: Semente do sorteio da busca aleatória
+
+    Returns:
+        list: Dicionários {parametro: valor}, um por tentativa
+    """
+    busca = espec.get('busca', 'grade')
+    if busca not in BUSCAS:
+        raise ValueError(f"busca deve ser uma de {BUSCAS}, recebido: {busca}")
+    parametros = espec['parametros']
+    desconhecidos = set(parametros) - set(PARAMETROS)
+    if desconhecidos:
+        raise ValueError(f"Parâmetros desconhecidos: {sorted(desconhecidos)} (válidos: {PARAMETROS})")
+
+    nomes = list(parametros)
+    if busca == 'grade':
+        for nome in nomes:
+            if not isinstance(parametros[nome], list):
+                raise ValueError(f"Na busca em grade '{nome}' deve ser uma lista de valores")
+        return [dict(zip(nomes, valores)) for valores in itertools.product(*(parametros[n] for n in nomes))]
+
+    gerador = random.Random(semente)
+    return [{nome: _sortear(parametros[nome], gerador) for nome in nomes}
+            for _ in range(espec.get('tentativas', 10))]
+
+
+def _sortear(valores, gerador):
+    """Sorteia um valor de uma lista ou de um intervalo {'min', 'max', 'log'}."""
+    if isinstance(valores, list):
+        return gerador.choice(valores)
+    minimo, maximo = valores['min'], valores['max']
+    if valores.get('log', False):
+        valor = math.exp(gerador.uniform(math.log(minimo), math.log(maximo)))
+    else:
+        valor = gerador.uniform(minimo, maximo)
+    if isinstance(minimo, int) and isinstance(maximo, int):
+        return int(round(valor))
+    return valor
+
+
+def _inicializar_processo(datasets, threads):
+    """Recebe os datasets compartilhados e limita as threads do processo de trabalho."""
+    global _datasets
+    _datasets = datasets
+    torch.set_num_threads(threads)
+
+
+def _executar_tentativa(tarefa):
+    """
+    Treina uma tentativa da varredura em um processo de trabalho.
+
+    Args:
+        tarefa: Tupla (índice, hiperparâmetros, opções de treino, semente, pasta de saída)
+
+    Returns:
+        dict: Hiperparâmetros e métricas da tentativa ('erro' preenchido se ela falhar)
+    """
+    indice, parametros, opcoes, semente, saida = tarefa
+    dataset_treino, dataset_validacao, classes = _datasets[parametros.get('tamanho_imagem')]
+    resultado = dict(tentativa=indice, **parametros, melhor_acc_validacao=None, melhor_epoca=None,
+                     validacao_loss_final=None, epocas=None, tempo_s=None, erro='')
+
+    caminho_log = os.path.join(saida, f'tentativa_{indice:03d}.log')
+    inicio = time.time()
+    with open(caminho_log, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        try:
+            # Mesmos pesos iniciais e mesma ordem dos lotes em todas as tentativas
+            definir_semente(semente)
+            modelo = RedeCnnCulturasAgricolas(num_classes=len(classes))
+            opcoes_tentativa = dict(opcoes)
+            for nome in ('learning_rate', 'batch_size'):
+                if nome in parametros:
+                    opcoes_tentativa[nome] = parametros[nome]
+            _, historico = treinar_rede(
+                modelo, dataset_treino, dataset_validacao, device='cpu',
+                caminho_melhor_modelo=os.path.join(saida, f'melhor_modelo_tentativa_{indice:03d}.pth'),
+                **opcoes_tentativa
+            )
+            acuracias = historico['validacao_acc']
+            resultado.update(
+                melhor_acc_validacao=historico['melhor_acc_validacao'],
+                melhor_epoca=acuracias.index(max(acuracias)) + 1 if acuracias else None,
+                validacao_loss_final=historico['validacao_loss'][-1] if acuracias else None,
+                epocas=len(acuracias)
+            )
+        except Exception as e:
+            print(f"❌ ERRO: {e!r}")
+            resultado['erro'] = repr(e)
+    resultado['tempo_s'] = time.time() - inicio
+    return resultado
+
+
+def executar_varredura(espec, caminho_dataset, opcoes_treino, paralelo=2, threads=None,
+                       semente=0, saida='varredura', imagens_treino=20, imagens_validacao=12,
+                       diretorio_cache=None):
+    """
+    Executa todas as tentativas de uma especificação em processos paralelos.
+
+    Args:
+        espec: Especificação da busca (ver gerar_tentativas)
+        caminho_dataset: Pasta com as imagens das culturas
+        opcoes_treino: Argumentos comuns repassados para treinar_rede (epochs, ...)
+        paralelo: Número de tentativas treinadas ao mesmo tempo
+        threads: Threads de cálculo por tentativa (None divide os núcleos igualmente)
+        semente: Semente da divisão dos dados, dos pesos iniciais e do sorteio
+        saida: Pasta dos logs, dos melhores modelos e da tabela de resultados
+        imagens_treino: Número de imagens por classe para treino
+        imagens_validacao: Número de imagens por classe para validação
+        diretorio_cache: Pasta do cache de tensores de preparar_datasets (None desativa)
+
+    Returns:
+        list: Resultados das tentativas, da melhor para a pior acurácia de validação
+    """
+    tentativas = gerar_tentativas(espec, semente)
+    if threads is None:
+        threads = max(1, (os.cpu_count() or 1) // paralelo)
+    os.makedirs(saida, exist_ok=True)
+
+    # Decodificar uma vez cada tamanho de imagem usado pelas tentativas
+    datasets = {}
+    for tamanho in sorted({t.get('tamanho_imagem') for t in tentativas}, key=lambda t: t or 0):
+        print(f"\nDecodificando dataset com tamanho_imagem={tamanho or 224}...")
+        definir_semente(semente)
+        dataset_treino, dataset_validacao, classes = preparar_datasets(
+            caminho_dataset,
+            tamanho_imagem=tamanho or 224,
+            imagens_treino=imagens_treino,
+            imagens_validacao=imagens_validacao,
+            diretorio_cache=diretorio_cache,
+            armazenamento='uint8'
+        )
+        if dataset_treino is None or dataset_validacao is None:
+            raise RuntimeError(f"Não foi possível carregar os datasets de '{caminho_dataset}'")
+        for dataset in (dataset_treino, dataset_validacao):
+            for tensor in dataset.tensors:
+                tensor.share_memory_()
+        datasets[tamanho] = (dataset_treino, dataset_validacao, classes)
+
+    print(f"\n{len(tentativas)} tentativa(s), {paralelo} em paralelo com {threads} thread(s) cada")
+    tarefas = [(i, parametros, opcoes_treino, semente, saida) for i, parametros in enumerate(tentativas, 1)]
+    resultados = []
+    contexto = mp.get_context('spawn')
+    with contexto.Pool(paralelo, initializer=_inicializar_processo, initargs=(datasets, threads)) as pool:
+        for resultado in pool.imap_unordered(_executar_tentativa, tarefas):
+            resultados.append(resultado)
+            if resultado['erro']:
+                print(f"❌ Tentativa {resultado['tentativa']} falhou: {resultado['erro']}")
+            else:
+                print(f"✓ Tentativa {resultado['tentativa']} ({len(resultados)}/{len(tarefas)}): "
+                      f"acurácia {resultado['melhor_acc_validacao']:.2f}% em {resultado['tempo_s']:.1f}s")
+
+    resultados.sort(key=lambda r: -r['melhor_acc_validacao'] if r['melhor_acc_validacao'] is not None else math.inf)
+    return resultados
+
+
+def salvar_resultados(resultados, caminho):
+    """Grava os resultados ordenados em um arquivo CSV."""
+    colunas = list(resultados[0]) if resultados else []
+    with open(caminho, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=['posicao'] + colunas)
+        escritor.writeheader()
+        for posicao, resultado in enumerate(resultados, 1):
+            escritor.writerow({'posicao': posicao, **resultado})
+
+
+def imprimir_resultados(resultados):
+    """Imprime a tabela das tentativas, da melhor para a pior."""
+    print("\n" + "="*80)
+    print("RESULTADOS DA VARREDURA")
+    print("="*80)
+    print(f"{'#':>3} {'Tent.':>5} {'LR':>10} {'Lote':>5} {'Tamanho':>8} {'Acurácia':>9} "
+          f"{'Época':>6} {'Perda val.':>11} {'Tempo':>8}")
+    print("-" * 80)
+    for posicao, r in enumerate(resultados, 1):
+        lr = f"{r['learning_rate']:.2e}" if 'learning_rate' in r else '-'
+        lote = r.get('batch_size', '-')
+        tamanho = r.get('tamanho_imagem', '-')
+        if r['erro']:
+            print(f"{posicao:>3} {r['tentativa']:>5} {lr:>10} {lote:>5} {tamanho:>8}  ERRO: {r['erro']}")
+            continue
+        print(f"{posicao:>3} {r['tentativa']:>5} {lr:>10} {lote:>5} {tamanho:>8} "
+              f"{r['melhor_acc_validacao']:>8.2f}% {r['melhor_epoca']:>6} "
+              f"{r['validacao_loss_final']:>11.4f} {r['tempo_s']:>7.1f}s")
+    print("="*80 + "\n")
+
+
+def main():
+    """Lê a especificação da busca, executa a varredura e grava a tabela de resultados."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__.split('\n\n', 1)[1])
+    parser.add_argument('--spec', default=None,
+                        help='Arquivo JSON com a especificação da busca (substitui as listas abaixo)')
+    parser.add_argument('--busca', choices=BUSCAS, default='grade', help='Tipo de busca (padrão: grade)')
+    parser.add_argument('--tentativas', type=int, default=10,
+                        help='Tentativas sorteadas na busca aleatória (padrão: 10)')
+    parser.add_argument('--learning-rate', type=float, nargs='+', default=[0.001],
+                        help='Taxas de aprendizado (padrão: 0.001)')
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[32], help='Tamanhos de lote (padrão: 32)')
+    parser.add_argument('--tamanho', type=int, nargs='+', default=[224],
+                        help='Tamanhos das imagens (padrão: 224)')
+    parser.add_argument('--epocas', type=int, default=20, help='Épocas por tentativa (padrão: 20)')
+    parser.add_argument('--paralelo', type=int, default=2, help='Tentativas simultâneas (padrão: 2)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Threads por tentativa (padrão: núcleos / paralelo)')
+    parser.add_argument('--semente', type=int, default=0, help='Semente da varredura (padrão: 0)')
+    parser.add_argument('--dataset', default='Agricultural-crops',
+                        help='Pasta com as imagens (padrão: Agricultural-crops)')
+    parser.add_argument('--treino', type=int, default=20, help='Imagens de treino por classe')
+    parser.add_argument('--validacao', type=int, default=12, help='Imagens de validação por classe')
+    parser.add_argument('--cache', default='.cache_culturas',
+                        help="Pasta do cache de tensores ('' desativa; padrão: .cache_culturas)")
+    parser.add_argument('--saida', default='varredura', help='Pasta dos resultados (padrão: varredura)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.dataset):
+        print(f"❌ ERRO: Pasta '{args.dataset}' não encontrada!")
+        return
+
+    espec = {
+        'busca': args.busca,
+        'tentativas': args.tentativas,
+        'parametros': {
+            'learning_rate': args.learning_rate,
+            'batch_size': args.batch_size,
+            'tamanho_imagem': args.tamanho
+        },
+        'fixos': {}
+    }
+    if args.spec:
+        with open(args.spec, encoding='utf-8') as f:
+            espec_arquivo = json.load(f)
+        espec['parametros'].update(espec_arquivo.pop('parametros', {}))
+        espec.update(espec_arquivo)
+
+    # Checkpoints completos não fazem sentido em tentativas curtas e paralelas
+    opcoes_treino = {'epochs': args.epocas, 'caminho_checkpoint': None}
+    opcoes_treino.update(espec.get('fixos', {}))
+
+    resultados = executar_varredura(
+        espec, args.dataset, opcoes_treino,
+        paralelo=args.paralelo,
+        threads=args.threads,
+        semente=args.semente,
+        saida=args.saida,
+        imagens_treino=args.treino,
+        imagens_validacao=args.validacao,
+        diretorio_cache=args.cache or None
+    )
+    imprimir_resultados(resultados)
+
+    caminho_resultados = os.path.join(args.saida, 'resultados_varredura.csv')
+    salvar_resultados(resultados, caminho_resultados)
+    with open(os.path.join(args.saida, 'espec_varredura.json'), 'w', encoding='utf-8') as f:
+        json.dump(espec, f, indent=2)
+    print(f"✓ Tabela salva em {caminho_resultados}")
+
+
+if __name__ == "__main__":
+    main()